@@ -0,0 +1,156 @@
+# Measures the cold start of every handler declared in serverless.yml.
+#
+#   python benchmarks/cold_start.py [--runs 5] [--json results.json]
+#
+# Each run imports the handler module in a fresh interpreter and times the
+# import and the first invocation with a sample event. AWS requests are
+# answered locally with empty responses, so the first invocation includes
+# client construction and request/response handling but no network time.
+# Handlers that fail on the empty responses are still timed and reported with
+# the error they raised.
+
+import argparse
+import importlib
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FUNCTION_RE = re.compile(r'^  (\w+):\n    handler: "([\w/.]+)\.(\w+)"', re.M)
+
+FAKE_ENV = {
+    "PROJECT_NAME": "bench",
+    "STAGE": "bench",
+    "AWS_APIGW_DOMAIN": "example.execute-api.us-east-1.amazonaws.com",
+    "AWS_APIGW_STAGE": "bench",
+    "AWS_SFN_ARN": "arn:aws:states:us-east-1:000000000000:stateMachine:bench",
+    "ORDER_ARRIVALS_TOPIC_ARN": "arn:aws:sns:us-east-1:000000000000:bench",
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "AWS_ACCESS_KEY_ID": "bench",
+    "AWS_SECRET_ACCESS_KEY": "bench",
+}
+
+
+def functions() -> list[tuple[str, str, str]]:
+    serverless = (ROOT / "serverless.yml").read_text()
+
+    return [
+        (name, path.replace("/", "."), attr)
+        for name, path, attr in FUNCTION_RE.findall(serverless)
+    ]
+
+
+def install_fake_transport():
+    from botocore.awsrequest import AWSResponse
+
+    from common import clients
+
+    class FakeRaw(io.BytesIO):
+        def stream(self, **kwargs):
+            yield self.getvalue()
+
+    def fake_send(request, **kwargs):
+        if "/functions/" in request.url:
+            body = b"null"
+        elif "json" in request.headers.get("Content-Type", b"").decode():
+            body = b"{}"
+        else:
+            body = b""
+
+        return AWSResponse(request.url, 200, {}, FakeRaw(body))
+
+    clients.session().events.register("before-send", fake_send)
+
+
+def child(name: str, module_name: str, attr: str):
+    sys.path.insert(0, str(ROOT))
+    sys.path.insert(0, str(ROOT / "benchmarks"))
+
+    from events import sample_event
+
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    imported = time.perf_counter()
+
+    install_fake_transport()
+
+    error = None
+    invoke_start = time.perf_counter()
+    try:
+        getattr(module, attr)(sample_event(name), None)
+    except Exception as e:
+        error = type(e).__name__
+    invoked = time.perf_counter()
+
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - start) * 1000,
+                "first_invocation_ms": (invoked - invoke_start) * 1000,
+                "error": error,
+            }
+        )
+    )
+
+
+def run(runs: int) -> dict:
+    env = {**FAKE_ENV, **os.environ}
+    results = {}
+
+    for name, module_name, attr in functions():
+        samples = []
+
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", name, module_name, attr],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+        results[name] = {
+            "import_ms": statistics.median(s["import_ms"] for s in samples),
+            "first_invocation_ms": statistics.median(
+                s["first_invocation_ms"] for s in samples
+            ),
+            "error": samples[-1]["error"],
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", dest="json_path")
+    parser.add_argument("--child", nargs=3)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    results = run(args.runs)
+
+    print(f"{'function':<28} {'import ms':>10} {'first call ms':>14}  error")
+    for name, r in results.items():
+        print(
+            f"{name:<28} {r['import_ms']:>10.1f} {r['first_invocation_ms']:>14.1f}"
+            f"  {r['error'] or ''}"
+        )
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
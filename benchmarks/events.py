@@ -0,0 +1,157 @@
+# Sample Lambda events for every handler in serverless.yml, shared by the
+# benchmark scripts.
+
+import json
+from datetime import datetime, timezone
+
+TENANT_ID = "bench-tenant"
+
+
+def user(
+    role: str = "client", user_id: str | None = None, tenant_id: str = TENANT_ID
+) -> dict:
+    return {
+        "tenant_id": tenant_id,
+        "user_id": user_id or f"{role}-1",
+        "email": f"{role}@example.com",
+        "username": role,
+        "role": role,
+    }
+
+
+def order(
+    order_id: str = "order-1",
+    items: int = 3,
+    history: int = 0,
+    tenant_id: str = TENANT_ID,
+    created_at: str | None = None,
+) -> dict:
+    created_at = created_at or datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat()
+    client = user("client", tenant_id=tenant_id)
+    cook = user("cook", tenant_id=tenant_id)
+
+    return {
+        "tenant_id": tenant_id,
+        "order_id": order_id,
+        "client_id#created_at": f"{client['user_id']}#{created_at}",
+        "client": client,
+        "items": [
+            {
+                "product": {
+                    "tenant_id": tenant_id,
+                    "product_id": f"product-{i}",
+                    "name": f"Product {i}",
+                    "price": "12.50",
+                    "image_url": f"https://example.com/products/{i}.png",
+                },
+                "quantity": i + 1,
+            }
+            for i in range(items)
+        ],
+        "status": "cooking",
+        "status#created_at": f"cooking#{created_at}",
+        "created_at": created_at,
+        "cook": cook,
+        "cook_id#created_at": f"cook-1#{created_at}",
+        "history": [
+            {"user": cook, "status": "cooking", "date": created_at}
+            for _ in range(history)
+        ],
+        "last_transition": {
+            "user": cook,
+            "status": "cooking",
+            "date": created_at,
+        },
+        "version": 1,
+    }
+
+
+def http_event(
+    body: dict | None = None,
+    path: dict | None = None,
+    query: dict | None = None,
+    role: str = "client",
+    headers: dict | None = None,
+    tenant_id: str = TENANT_ID,
+) -> dict:
+    return {
+        "pathParameters": {"tenant_id": tenant_id, **(path or {})},
+        "queryStringParameters": query,
+        "headers": headers or {},
+        "body": json.dumps(body) if body != None else None,
+        "requestContext": {"authorizer": user(role, tenant_id=tenant_id)},
+    }
+
+
+def eventbridge_event(detail_type: str, detail: dict) -> dict:
+    return {"detail-type": detail_type, "detail": detail}
+
+
+def websocket_event(connection_id: str = "connection-1", body: dict | None = None):
+    return {
+        "requestContext": {
+            "connectionId": connection_id,
+            "connectedAt": 1735689600000,
+        },
+        "body": json.dumps(body) if body != None else None,
+    }
+
+
+# An import_orders body: one order record per line.
+def import_body(orders: int, tenant_id: str = TENANT_ID) -> str:
+    return "\n".join(
+        json.dumps(
+            {
+                "order_id": f"import-{i}",
+                "client": user("client", tenant_id=tenant_id),
+                "items": [{"product_id": "product-1", "quantity": 1}],
+            }
+        )
+        for i in range(orders)
+    )
+
+
+def sample_event(function_name: str) -> dict:
+    order_path = {"order_id": "order-1"}
+
+    match function_name:
+        case "create_order":
+            return http_event({"items": [{"product_id": "product-1", "quantity": 2}]})
+        case "get_orders":
+            return http_event(query={"limit": "10"})
+        case "get_order" | "get_order_history":
+            return http_event(path=order_path)
+        case "batch_get_orders":
+            return http_event({"order_ids": [f"order-{i}" for i in range(10)]})
+        case "import_orders":
+            return http_event(role="admin") | {"body": import_body(10)}
+        case "update_order_status":
+            return http_event(
+                {"status": "wait_for_dispatcher"}, order_path, role="cook"
+            )
+        case "update_order_statuses":
+            return http_event(
+                {
+                    "order_ids": [f"order-{i}" for i in range(10)],
+                    "status": "wait_for_dispatcher",
+                },
+                role="cook",
+            )
+        case "start_order_execution" | "broadcast_order_created":
+            return eventbridge_event("order.created", order())
+        case "resume_order_workflow" | "broadcast_order_status":
+            return eventbridge_event("order.status_updated", order())
+        case "put_order_task_token":
+            return {"tenant_id": TENANT_ID, "order_id": "order-1", "task_token": "t"}
+        case "notify_order_arrival":
+            return {"tenant_id": TENANT_ID, "order_id": "order-1"}
+        case "subscribe_order_arrival":
+            return eventbridge_event("user.created", user())
+        case "websocket_subscribe":
+            return websocket_event(body={"tenant_id": TENANT_ID, "order_id": None})
+        case "websocket_unsubscribe":
+            return websocket_event(
+                body={"tenant_id": TENANT_ID, "order_ids": ["order-1", "order-2"]}
+            )
+        case _:
+            return http_event() | websocket_event()
@@ -0,0 +1,286 @@
+# Runs the request handlers against in-memory AWS stand-ins (benchmarks/stubs.py)
+# and reports latency, CPU time, peak memory and AWS calls per request.
+#
+#   python benchmarks/handlers.py [--tenants 3] [--orders 500] [--items 5]
+#       [--history 20] [--subscribers 100] [--iterations 200]
+#       [--only get_orders,get_order] [--json results.json]
+#
+# Every tenant gets --orders orders with --items line items and --history
+# history entries each. The first order of every tenant is watched by
+# --subscribers connections, half of them tenant-wide. Latency and CPU time are
+# measured without tracing. Peak memory is measured in a separate pass under
+# tracemalloc, which would otherwise slow every call down. The stand-ins scan
+# their whole table for every query, so compare results at the same scale.
+#
+# The AWS call counts are the point: a handler that suddenly makes one query
+# per order or per subscriber shows up here long before it shows up in a bill.
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from cold_start import FAKE_ENV
+
+for name, value in FAKE_ENV.items():
+    os.environ.setdefault(name, value)
+
+from events import eventbridge_event, http_event, order, user, websocket_event
+from stubs import Stubs
+
+from common import to_json
+from schemas import Order, OrderHistoryRecord, OrderSubscription
+from schemas.storage import encode_history_entry
+
+MEMORY_ITERATIONS = 20
+
+
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class Dataset:
+    def __init__(self, stubs: Stubs, args):
+        self.stubs = stubs
+        self.args = args
+        self.tenants = [f"bench-tenant-{t}" for t in range(args.tenants)]
+        self.order_ids = [f"order-{i}" for i in range(args.orders)]
+
+        orders = stubs.table("orders")
+        history = stubs.table("order-history")
+        subscriptions = stubs.table("ws-order-subscriptions")
+
+        for tenant_id in self.tenants:
+            for i, order_id in enumerate(self.order_ids):
+                created_at = f"2025-01-01T00:{i // 60 % 60:02}:{i % 60:02}+00:00"
+                data = order(order_id, args.items, 0, tenant_id, created_at)
+                orders.items[(tenant_id, order_id)] = Order(**data).to_item()
+
+                for h in range(args.history):
+                    record = OrderHistoryRecord(
+                        tenant_id=tenant_id,
+                        order_id=order_id,
+                        user=user("cook", tenant_id=tenant_id),
+                        status="cooking",
+                        date=f"{created_at}#{h:06}",
+                    )
+                    item = encode_history_entry(record.model_dump())
+                    history.items[(item["tenant_id#order_id"], item["date"])] = item
+
+            for s in range(args.subscribers):
+                sub = OrderSubscription(
+                    tenant_id=tenant_id,
+                    order_id=self.order_ids[0] if s % 2 == 0 else None,
+                    connection_id=f"{tenant_id}-connection-{s}",
+                    connected_at=1735689600000,
+                )
+                item = sub.model_dump()
+                subscriptions.items[subscriptions.key_of(item)] = item
+
+    def tenant(self, i: int) -> str:
+        return self.tenants[i % len(self.tenants)]
+
+    def stored_order(self, tenant_id: str, order_id: str) -> dict:
+        return self.stubs.table("orders").items[(tenant_id, order_id)]
+
+    # Round trip through JSON, the way EventBridge delivers the detail.
+    def detail(self, tenant_id: str, order_id: str) -> dict:
+        return json.loads(to_json(self.stored_order(tenant_id, order_id)))
+
+
+def scenarios(data: Dataset) -> dict[str, tuple[str, Callable[[int], dict]]]:
+    rng = random.Random(0)
+    product_ids = [f"product-{i}" for i in range(data.args.items)]
+
+    def create_order(i):
+        items = [{"product_id": p, "quantity": 1} for p in product_ids]
+        return http_event({"items": items}, tenant_id=data.tenant(i))
+
+    def get_orders(i):
+        return http_event(query={"limit": "20"}, tenant_id=data.tenant(i))
+
+    def get_order(i):
+        path = {"order_id": rng.choice(data.order_ids)}
+        return http_event(path=path, tenant_id=data.tenant(i))
+
+    def update_order_status(i):
+        tenant_id = data.tenant(i)
+        order_id = data.order_ids[i % len(data.order_ids)]
+
+        # Put the order back where the transition can apply, outside the timing.
+        item = data.stored_order(tenant_id, order_id)
+        item["status"] = "cooking"
+        item["status#created_at"] = f"cooking#{item['created_at']}"
+
+        return http_event(
+            {"status": "wait_for_dispatcher"},
+            {"order_id": order_id},
+            role="cook",
+            tenant_id=tenant_id,
+        )
+
+    def broadcast_order_created(i):
+        detail = data.detail(data.tenant(i), data.order_ids[0])
+        return eventbridge_event("order.created", detail)
+
+    def broadcast_order_status(i):
+        detail = data.detail(data.tenant(i), data.order_ids[0])
+        return eventbridge_event("order.status_updated", detail)
+
+    def websocket_subscribe(i):
+        body = {"tenant_id": data.tenant(i), "order_id": rng.choice(data.order_ids)}
+        return websocket_event(f"new-connection-{i}", body)
+
+    def websocket_disconnect(i):
+        tenant_id = data.tenant(i)
+        sub = OrderSubscription(
+            tenant_id=tenant_id,
+            order_id=data.order_ids[1],
+            connection_id=f"closing-connection-{i}",
+            connected_at=1735689600000,
+        )
+        subscriptions = data.stubs.table("ws-order-subscriptions")
+        subscriptions.items[subscriptions.key_of(sub.model_dump())] = sub.model_dump()
+
+        return websocket_event(sub.connection_id)
+
+    return {
+        "create_order": ("functions.create_order", create_order),
+        "get_orders": ("functions.get_orders", get_orders),
+        "get_order": ("functions.get_order", get_order),
+        "update_order_status": ("functions.update_order_status", update_order_status),
+        "broadcast_order_created": (
+            "functions.websocket.broadcast_order_created",
+            broadcast_order_created,
+        ),
+        "broadcast_order_status": (
+            "functions.websocket.broadcast_order_status",
+            broadcast_order_status,
+        ),
+        "websocket_subscribe": ("functions.websocket.subscribe", websocket_subscribe),
+        "websocket_disconnect": (
+            "functions.websocket.disconnect",
+            websocket_disconnect,
+        ),
+    }
+
+
+def failed(result) -> bool:
+    return isinstance(result, dict) and result.get("statusCode", 200) >= 400
+
+
+def measure(stubs: Stubs, handler, prepare, iterations: int, warmup: int) -> dict:
+    latencies, cpu_times = [], []
+    calls: Counter = Counter()
+    errors = 0
+
+    for i in range(warmup + iterations):
+        event = prepare(i)
+        stubs.calls.clear()
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            result = handler(event, None)
+        except Exception as e:
+            result = e
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+        if i < warmup:
+            continue
+
+        errors += isinstance(result, Exception) or failed(result)
+        latencies.append(wall * 1000)
+        cpu_times.append(cpu * 1000)
+        calls.update(stubs.calls)
+
+    peak = 0
+    tracemalloc.start()
+    for i in range(MEMORY_ITERATIONS):
+        event = prepare(warmup + iterations + i)
+        tracemalloc.reset_peak()
+        try:
+            handler(event, None)
+        except Exception:
+            pass
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "cpu_ms": statistics.mean(cpu_times),
+        "peak_kib": peak / 1024,
+        "aws_calls": sum(calls.values()) / iterations,
+        "aws_calls_by_operation": {
+            op: count / iterations for op, count in sorted(calls.items())
+        },
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=3)
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--history", type=int, default=20)
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only")
+    parser.add_argument("--json", dest="json_path")
+    args = parser.parse_args()
+
+    stubs = Stubs({f"product-{i}" for i in range(args.items)})
+    stubs.install()
+    data = Dataset(stubs, args)
+
+    selected = scenarios(data)
+    if args.only:
+        selected = {name: selected[name] for name in args.only.split(",")}
+
+    # Keeps the handlers' own log lines (e.g. metrics records) out of the report.
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for name, (module_name, prepare) in selected.items():
+            handler = importlib.import_module(module_name).handler
+            results[name] = measure(
+                stubs, handler, prepare, args.iterations, args.warmup
+            )
+
+    print(
+        f"{'handler':<26} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu ms':>8}"
+        f" {'peak KiB':>9} {'AWS/req':>8}  errors"
+    )
+    for name, r in results.items():
+        print(
+            f"{name:<26} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+            f" {r['cpu_ms']:>8.2f} {r['peak_kib']:>9.0f} {r['aws_calls']:>8.1f}"
+            f"  {r['errors'] or ''}"
+        )
+        calls = ", ".join(
+            f"{op}={n:g}" for op, n in r["aws_calls_by_operation"].items()
+        )
+        print(f"{'':<26} {calls}")
+
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Compares the cost of reading stored orders on internal paths.
+#
+#   python benchmarks/order_construction.py [--items 20] [--history 50]
+#
+# For a large order with a long inline history (the worst case left by orders
+# written before the history table), this times building the validated Order
+# model, building it with model_construct, and the trusted read used by the
+# status broadcast: Order.decode_trusted plus the compact delta message.
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+os.environ.setdefault("PROJECT_NAME", "bench")
+os.environ.setdefault("STAGE", "bench")
+
+from events import order
+
+from common import to_json
+from schemas import VALIDATION_SAMPLE_RATE, Order, OrderStatusUpdate
+from schemas.storage import decode_order
+
+
+def delta(data: dict) -> OrderStatusUpdate:
+    latest = data["last_transition"]
+
+    return OrderStatusUpdate(
+        tenant_id=data["tenant_id"],
+        order_id=data["order_id"],
+        status=data["status"],
+        actor=latest["user"],
+        date=latest["date"],
+        version=data["version"],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--history", type=int, default=50)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    stored = Order(**order("order-1", args.items, args.history)).to_item()
+    stored = json.loads(to_json(stored), parse_float=Decimal, parse_int=Decimal)
+    detail = json.loads(to_json(stored))
+
+    cases = {
+        "decode only": lambda: decode_order(detail),
+        "Order.from_item (validated)": lambda: Order.from_item(detail),
+        "Order.model_construct": lambda: Order.model_construct(**decode_order(detail)),
+        "validated + delta": lambda: delta(Order.from_item(detail).model_dump()),
+        "decode_trusted + delta": lambda: delta(Order.decode_trusted(detail)),
+    }
+
+    print(
+        f"{args.items} items, {args.history} history entries, "
+        f"validation sample rate {VALIDATION_SAMPLE_RATE:g}"
+    )
+
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=3))
+        print(f"{name:<30} {seconds / args.number * 1e6:>10.1f} us/order")
+
+
+if __name__ == "__main__":
+    main()
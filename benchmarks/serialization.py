@@ -0,0 +1,73 @@
+# Micro-benchmark for the JSON backends in common.serialization.
+#
+#   python benchmarks/serialization.py [--orders 100] [--items 5] [--history 5]
+#
+# Serializes a get_orders-style listing of raw DynamoDB items (numbers as
+# Decimal, as boto3 returns them) with every available backend, next to
+# pydantic's model_dump_json for the same orders as models.
+
+import argparse
+import os
+import sys
+import timeit
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+os.environ.setdefault("PROJECT_NAME", "bench")
+os.environ.setdefault("STAGE", "bench")
+
+from events import order
+
+from common import serialization
+from schemas import Order
+from schemas.storage import decode_order
+
+
+def dynamodb_item(order_id: str, items: int, history: int) -> dict:
+    item = decode_order(order(order_id, items, history))
+
+    for line in item["items"]:
+        line["product"]["price"] = Decimal(line["product"]["price"])
+        line["quantity"] = Decimal(line["quantity"])
+
+    item["version"] = Decimal(item["version"])
+    return item
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--history", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    listing = {
+        "items": [
+            dynamodb_item(f"order-{i}", args.items, args.history)
+            for i in range(args.orders)
+        ],
+        "next_key": None,
+    }
+    models = [Order(**item) for item in listing["items"]]
+
+    cases = {
+        f"to_json[{name}]": (lambda dumps=dumps: dumps(listing))
+        for name, (dumps, _) in serialization.JSON_BACKENDS.items()
+    }
+    cases["pydantic model_dump_json"] = lambda: [m.model_dump_json() for m in models]
+
+    size = len(serialization.to_json(listing).encode("utf-8"))
+    print(f"{args.orders} orders, {size / 1024:.1f} KiB per response")
+
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=args.repeat, repeat=3))
+        print(f"{name:<28} {seconds / args.repeat * 1000:>8.3f} ms/response")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,748 @@
+# In-memory stand-ins for the AWS services the handlers talk to, used by the
+# handler benchmarks. They implement only the request shapes this repo sends,
+# keep everything in dicts and count every call, so a benchmark measures the
+# handler's own work and how many requests it makes.
+#
+# Items are copied on the way in and out, and numbers are stored as Decimal,
+# like boto3 returns them. Anything the stand-ins don't understand raises
+# NotImplementedError instead of being silently ignored.
+
+import io
+import json
+import re
+import uuid
+from collections import Counter
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any
+
+from boto3.dynamodb.conditions import AttributeBase, ConditionBase
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from common import clients, resource_name
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+TABLES = {
+    "orders": (
+        ("tenant_id", "order_id"),
+        {
+            "tenant-client-idx": ("tenant_id", "client_id#created_at"),
+            "tenant-cook-idx": ("tenant_id", "cook_id#created_at"),
+            "tenant-dispatcher-idx": ("tenant_id", "dispatcher_id#created_at"),
+            "tenant-driver-idx": ("tenant_id", "driver_id#created_at"),
+            "tenant-status-idx": ("tenant_id", "status#created_at"),
+            "tenant-created-at-idx": ("tenant_id", "created_at"),
+        },
+    ),
+    "order-history": (("tenant_id#order_id", "date"), {}),
+    "idempotency-keys": (("idempotency_key", None), {}),
+    "ws-order-subscriptions": (
+        ("tenant_id#order_id", "connection_id"),
+        {"connection-id-index": ("connection_id", None)},
+    ),
+}
+
+BATCH_WRITE_SIZE = 25
+
+MISSING = object()
+
+
+def stored(value: Any) -> Any:
+    if isinstance(value, bool) or value == None:
+        return value
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: stored(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [stored(v) for v in value]
+    if isinstance(value, set):
+        return {stored(v) for v in value}
+    return value
+
+
+def typed(item: dict) -> dict:
+    return {k: serializer.serialize(v) for k, v in item.items()}
+
+
+def untyped(item: dict) -> dict:
+    return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+
+# Mirrors client.exceptions: any error code is available as a ClientError
+# subclass, so handlers can catch e.g. exceptions.GoneException.
+class Exceptions:
+    def __init__(self):
+        self._classes: dict[str, type] = {}
+
+    def __getattr__(self, code: str) -> type:
+        if code.startswith("_"):
+            raise AttributeError(code)
+
+        if not code in self._classes:
+            self._classes[code] = type(code, (ClientError,), {})
+
+        return self._classes[code]
+
+    def error(self, code: str, operation: str, **extra) -> ClientError:
+        cls = getattr(self, code)
+        return cls({"Error": {"Code": code, "Message": code}, **extra}, operation)
+
+
+class Service:
+    name = ""
+
+    def __init__(self, calls: Counter):
+        self.calls = calls
+        self.exceptions = Exceptions()
+
+    def _call(self, operation: str):
+        self.calls[f"{self.name}.{operation}"] += 1
+
+
+CONDITION_RE = re.compile(
+    r"^\s*(?:(attribute_exists|attribute_not_exists)\(\s*([#\w]+)\s*\)"
+    r"|begins_with\(\s*([#\w]+)\s*,\s*(:\w+)\s*\)"
+    r"|([#\w]+)\s*(=|<>|<=|>=|<|>)\s*(:\w+))\s*$"
+)
+
+
+def compare(operator: str, left: Any, right: Any) -> bool:
+    if left is MISSING:
+        return False
+
+    match operator:
+        case "=":
+            return left == right
+        case "<>":
+            return left != right
+        case "<":
+            return left < right
+        case "<=":
+            return left <= right
+        case ">":
+            return left > right
+        case ">=":
+            return left >= right
+
+    raise NotImplementedError(operator)
+
+
+def name_of(token: str, names: dict) -> str:
+    return names[token] if token.startswith("#") else token
+
+
+def matches(
+    condition: ConditionBase | str | None,
+    item: dict,
+    names: dict | None = None,
+    values: dict | None = None,
+) -> bool:
+    if condition == None:
+        return True
+
+    if isinstance(condition, str):
+        return any(
+            all(
+                _matches_term(term, item, names or {}, values or {})
+                for term in re.split(r"\s+AND\s+", alternative)
+            )
+            for alternative in re.split(r"\s+OR\s+", condition.strip())
+        )
+
+    expression = condition.get_expression()
+    operator = expression["operator"]
+    operands = expression["values"]
+
+    def value(operand):
+        if isinstance(operand, AttributeBase):
+            return item.get(operand.name, MISSING)
+        return operand
+
+    match operator:
+        case "AND":
+            return all(matches(c, item) for c in operands)
+        case "OR":
+            return any(matches(c, item) for c in operands)
+        case "NOT":
+            return not matches(operands[0], item)
+        case "begins_with":
+            left = value(operands[0])
+            return isinstance(left, str) and left.startswith(operands[1])
+        case "attribute_exists":
+            return value(operands[0]) is not MISSING
+        case "attribute_not_exists":
+            return value(operands[0]) is MISSING
+        case "BETWEEN":
+            left = value(operands[0])
+            return left is not MISSING and operands[1] <= left <= operands[2]
+        case "IN":
+            return value(operands[0]) in operands[1]
+
+    return compare(operator, value(operands[0]), value(operands[1]))
+
+
+def _matches_term(term: str, item: dict, names: dict, values: dict) -> bool:
+    match = CONDITION_RE.match(term)
+    if match == None:
+        raise NotImplementedError(f"Unsupported condition: {term}")
+
+    function, path, prefix_path, prefix, left, operator, right = match.groups()
+
+    if function != None:
+        exists = name_of(path, names) in item
+        return exists if function == "attribute_exists" else not exists
+
+    if prefix_path != None:
+        current = item.get(name_of(prefix_path, names))
+        return isinstance(current, str) and current.startswith(values[prefix])
+
+    return compare(operator, item.get(name_of(left, names), MISSING), values[right])
+
+
+def project(item: dict, projection: str | None, names: dict | None) -> dict:
+    if projection == None:
+        return stored(item)
+
+    attributes = [name_of(p.strip(), names or {}) for p in projection.split(",")]
+    return {a: stored(item[a]) for a in attributes if a in item}
+
+
+# Applies SET, ADD and REMOVE clauses in place and returns the names of the
+# attributes that were touched.
+def apply_update(item: dict, expression: str, names: dict, values: dict) -> list:
+    touched = []
+    clauses = re.split(r"\b(SET|ADD|REMOVE|DELETE)\b", expression)
+
+    for keyword, body in zip(clauses[1::2], clauses[2::2]):
+        keyword = keyword.upper()
+
+        for action in body.split(","):
+            action = action.strip()
+            if action == "":
+                continue
+
+            if "(" in action:
+                raise NotImplementedError(f"Unsupported update: {action}")
+
+            if keyword == "SET":
+                path, value = (part.strip() for part in action.split("="))
+                attribute = name_of(path, names)
+                item[attribute] = stored(values[value])
+            elif keyword == "ADD":
+                path, value = action.split()
+                attribute = name_of(path, names)
+                current = item.get(attribute)
+                addend = stored(values[value])
+                if isinstance(addend, set):
+                    item[attribute] = (current or set()) | addend
+                else:
+                    item[attribute] = (current or 0) + addend
+            elif keyword == "REMOVE":
+                attribute = name_of(action, names)
+                item.pop(attribute, None)
+            else:
+                raise NotImplementedError(f"Unsupported update: {keyword}")
+
+            touched.append(attribute)
+
+    return touched
+
+
+class BatchWriter:
+    def __init__(self, table: "Table", overwrite_by_pkeys: list | None = None):
+        self.table = table
+        self.overwrite_by_pkeys = overwrite_by_pkeys
+        self.pending: list[tuple[str, dict]] = []
+
+    def put_item(self, Item: dict):
+        self._add("put", Item)
+
+    def delete_item(self, Key: dict):
+        self._add("delete", Key)
+
+    def _add(self, action: str, item: dict):
+        if self.overwrite_by_pkeys != None:
+            key = [item.get(k) for k in self.overwrite_by_pkeys]
+            self.pending = [
+                (a, i)
+                for a, i in self.pending
+                if [i.get(k) for k in self.overwrite_by_pkeys] != key
+            ]
+
+        self.pending.append((action, item))
+
+        if len(self.pending) >= BATCH_WRITE_SIZE:
+            self.flush()
+
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+
+        self.table.calls["dynamodb.BatchWriteItem"] += 1
+
+        for action, item in self.pending:
+            if action == "put":
+                self.table.items[self.table.key_of(item)] = stored(item)
+            else:
+                self.table.items.pop(self.table.key_of(item), None)
+
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+class Table:
+    def __init__(
+        self,
+        name: str,
+        key: tuple,
+        indexes: dict,
+        calls: Counter,
+        exceptions: Exceptions,
+    ):
+        self.name = name
+        self.key = key
+        self.indexes = indexes
+        self.calls = calls
+        self.items: dict[tuple, dict] = {}
+        self.meta = SimpleNamespace(client=SimpleNamespace(exceptions=exceptions))
+
+    def key_of(self, item: dict) -> tuple:
+        return tuple(item[k] for k in self.key if k != None)
+
+    def _key_dict(self, item: dict, index: tuple | None = None) -> dict:
+        attributes = [*self.key, *(index or ())]
+        return {k: item[k] for k in attributes if k != None and k in item}
+
+    def _check(self, operation: str, old: dict | None, kwargs: dict):
+        condition = kwargs.get("ConditionExpression")
+        if condition == None:
+            return
+
+        if not matches(
+            condition,
+            old or {},
+            kwargs.get("ExpressionAttributeNames"),
+            kwargs.get("ExpressionAttributeValues"),
+        ):
+            extra = {}
+            if (
+                kwargs.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD"
+                and old != None
+            ):
+                extra["Item"] = typed(old)
+
+            raise self.meta.client.exceptions.error(
+                "ConditionalCheckFailedException", operation, **extra
+            )
+
+    def get_item(self, Key: dict, **kwargs) -> dict:
+        self.calls["dynamodb.GetItem"] += 1
+        item = self.items.get(self.key_of(Key))
+
+        if item == None:
+            return {}
+
+        return {
+            "Item": project(
+                item,
+                kwargs.get("ProjectionExpression"),
+                kwargs.get("ExpressionAttributeNames"),
+            )
+        }
+
+    def put_item(self, Item: dict, **kwargs) -> dict:
+        self.calls["dynamodb.PutItem"] += 1
+        key = self.key_of(Item)
+        self._check("PutItem", self.items.get(key), kwargs)
+        self.items[key] = stored(Item)
+        return {}
+
+    def update_item(self, Key: dict, UpdateExpression: str, **kwargs) -> dict:
+        self.calls["dynamodb.UpdateItem"] += 1
+        key = self.key_of(Key)
+        old = self.items.get(key)
+        self._check("UpdateItem", old, kwargs)
+
+        new = stored({**(old or Key)})
+        touched = apply_update(
+            new,
+            UpdateExpression,
+            kwargs.get("ExpressionAttributeNames") or {},
+            kwargs.get("ExpressionAttributeValues") or {},
+        )
+        self.items[key] = new
+
+        match kwargs.get("ReturnValues") or "NONE":
+            case "NONE":
+                return {}
+            case "ALL_NEW":
+                return {"Attributes": stored(new)}
+            case "ALL_OLD":
+                return {"Attributes": stored(old)} if old != None else {}
+            case "UPDATED_NEW":
+                source = new
+            case "UPDATED_OLD":
+                source = old or {}
+            case other:
+                raise NotImplementedError(other)
+
+        return {"Attributes": {a: stored(source[a]) for a in touched if a in source}}
+
+    def delete_item(self, Key: dict, **kwargs) -> dict:
+        self.calls["dynamodb.DeleteItem"] += 1
+        key = self.key_of(Key)
+        old = self.items.get(key)
+        self._check("DeleteItem", old, kwargs)
+        self.items.pop(key, None)
+
+        if kwargs.get("ReturnValues") == "ALL_OLD" and old != None:
+            return {"Attributes": stored(old)}
+        return {}
+
+    def batch_writer(self, overwrite_by_pkeys: list | None = None) -> BatchWriter:
+        return BatchWriter(self, overwrite_by_pkeys)
+
+    def _page(self, candidates: list[dict], index: tuple | None, kwargs: dict):
+        start = 0
+        start_key = kwargs.get("ExclusiveStartKey")
+        if start_key != None:
+            position = self.key_of(start_key)
+            for i, item in enumerate(candidates):
+                if self.key_of(item) == position:
+                    start = i + 1
+                    break
+
+        limit = kwargs.get("Limit")
+        end = len(candidates) if limit == None else start + limit
+        evaluated = candidates[start:end]
+
+        items = [
+            project(
+                item,
+                kwargs.get("ProjectionExpression"),
+                kwargs.get("ExpressionAttributeNames"),
+            )
+            for item in evaluated
+            if matches(
+                kwargs.get("FilterExpression"),
+                item,
+                kwargs.get("ExpressionAttributeNames"),
+                kwargs.get("ExpressionAttributeValues"),
+            )
+        ]
+
+        resp: dict = {"Count": len(items), "ScannedCount": len(evaluated)}
+
+        if kwargs.get("Select") != "COUNT":
+            resp["Items"] = items
+
+        if end < len(candidates) and len(evaluated) > 0:
+            resp["LastEvaluatedKey"] = self._key_dict(evaluated[-1], index)
+
+        return resp
+
+    def query(self, KeyConditionExpression: ConditionBase | str, **kwargs) -> dict:
+        self.calls["dynamodb.Query"] += 1
+
+        index = self.key
+        if kwargs.get("IndexName") != None:
+            index = self.indexes[kwargs["IndexName"]]
+
+        candidates = [
+            item
+            for item in self.items.values()
+            if all(k in item for k in index if k != None)
+            and matches(
+                KeyConditionExpression,
+                item,
+                kwargs.get("ExpressionAttributeNames"),
+                kwargs.get("ExpressionAttributeValues"),
+            )
+        ]
+
+        sort_key = index[1]
+        if sort_key != None:
+            candidates.sort(
+                key=lambda item: (item[sort_key], self.key_of(item)),
+                reverse=not kwargs.get("ScanIndexForward", True),
+            )
+
+        return self._page(candidates, index, kwargs)
+
+    def scan(self, **kwargs) -> dict:
+        self.calls["dynamodb.Scan"] += 1
+        candidates = list(self.items.values())
+
+        total = kwargs.get("TotalSegments")
+        if total != None:
+            segment = kwargs["Segment"]
+            candidates = [
+                item
+                for item in candidates
+                if hash(self.key_of(item)) % total == segment
+            ]
+
+        return self._page(candidates, None, kwargs)
+
+
+class DynamoDB:
+    def __init__(self, calls: Counter):
+        self.calls = calls
+        self.exceptions = Exceptions()
+        self.tables: dict[str, Table] = {}
+
+        for basename, (key, indexes) in TABLES.items():
+            name = resource_name(basename)
+            self.tables[name] = Table(name, key, indexes, calls, self.exceptions)
+
+    def Table(self, name: str) -> Table:
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems: dict) -> dict:
+        self.calls["dynamodb.BatchGetItem"] += 1
+        responses = {}
+
+        for name, request in RequestItems.items():
+            table = self.tables[name]
+            responses[name] = [
+                project(
+                    table.items[table.key_of(key)],
+                    request.get("ProjectionExpression"),
+                    request.get("ExpressionAttributeNames"),
+                )
+                for key in request["Keys"]
+                if table.key_of(key) in table.items
+            ]
+
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+
+# The low-level client over the same tables: typed values in and out.
+class DynamoDBClient:
+    def __init__(self, dynamodb: DynamoDB):
+        self.dynamodb = dynamodb
+        self.exceptions = dynamodb.exceptions
+
+    def _call(self, operation: str, TableName: str, **kwargs) -> dict:
+        for argument in (
+            "Key",
+            "Item",
+            "ExclusiveStartKey",
+            "ExpressionAttributeValues",
+        ):
+            if argument in kwargs:
+                kwargs[argument] = untyped(kwargs[argument])
+
+        resp = getattr(self.dynamodb.tables[TableName], operation)(**kwargs)
+
+        for result in ("Item", "Attributes", "LastEvaluatedKey"):
+            if result in resp:
+                resp[result] = typed(resp[result])
+        if "Items" in resp:
+            resp["Items"] = [typed(item) for item in resp["Items"]]
+
+        return resp
+
+    def get_item(self, **kwargs) -> dict:
+        return self._call("get_item", **kwargs)
+
+    def put_item(self, **kwargs) -> dict:
+        return self._call("put_item", **kwargs)
+
+    def update_item(self, **kwargs) -> dict:
+        return self._call("update_item", **kwargs)
+
+    def delete_item(self, **kwargs) -> dict:
+        return self._call("delete_item", **kwargs)
+
+    def query(self, **kwargs) -> dict:
+        return self._call("query", **kwargs)
+
+    def scan(self, **kwargs) -> dict:
+        return self._call("scan", **kwargs)
+
+    def batch_write_item(self, RequestItems: dict) -> dict:
+        self.dynamodb.calls["dynamodb.BatchWriteItem"] += 1
+
+        for name, requests in RequestItems.items():
+            table = self.dynamodb.tables[name]
+            for request in requests:
+                if "PutRequest" in request:
+                    item = untyped(request["PutRequest"]["Item"])
+                    table.items[table.key_of(item)] = stored(item)
+                else:
+                    key = untyped(request["DeleteRequest"]["Key"])
+                    table.items.pop(table.key_of(key), None)
+
+        return {"UnprocessedItems": {}}
+
+
+class EventBridge(Service):
+    name = "events"
+
+    def __init__(self, calls: Counter):
+        super().__init__(calls)
+        self.entries: list[dict] = []
+
+    def put_events(self, Entries: list) -> dict:
+        self._call("PutEvents")
+
+        if len(Entries) > 10:
+            raise self.exceptions.error("ValidationException", "PutEvents")
+
+        self.entries.extend(Entries)
+        return {
+            "FailedEntryCount": 0,
+            "Entries": [{"EventId": str(uuid.uuid4())} for _ in Entries],
+        }
+
+
+class StepFunctions(Service):
+    name = "stepfunctions"
+
+    def __init__(self, calls: Counter, history_events: int = 20):
+        super().__init__(calls)
+        self.history_events = history_events
+
+    def start_execution(self, stateMachineArn: str, input: str, **kwargs) -> dict:
+        self._call("StartExecution")
+        return {"executionArn": f"{stateMachineArn}:{uuid.uuid4()}"}
+
+    def send_task_success(self, taskToken: str, output: str) -> dict:
+        self._call("SendTaskSuccess")
+        return {}
+
+    def send_task_failure(self, taskToken: str, **kwargs) -> dict:
+        self._call("SendTaskFailure")
+        return {}
+
+    def get_execution_history(self, executionArn: str, **kwargs) -> dict:
+        self._call("GetExecutionHistory")
+        events = [
+            {"id": i + 1, "type": "TaskStateEntered", "timestamp": "2025-01-01"}
+            for i in range(self.history_events - 1)
+        ]
+        events.append(
+            {"id": self.history_events, "type": "ExecutionSucceeded", "timestamp": ""}
+        )
+
+        return {"events": events[: kwargs.get("maxResults", 100)]}
+
+
+# Answers the catalog service's internal lookup functions from a fixed product
+# list: product_ids in `products` exist, everything else doesn't.
+class Lambda(Service):
+    name = "lambda"
+
+    def __init__(self, calls: Counter, products: set[str]):
+        super().__init__(calls)
+        self.products = products
+
+    def _product(self, tenant_id: str, product_id: str) -> dict | None:
+        if not product_id in self.products:
+            return None
+
+        return {
+            "tenant_id": tenant_id,
+            "product_id": product_id,
+            "name": product_id.replace("-", " ").title(),
+            "price": 12.5,
+            "image_url": f"https://example.com/products/{product_id}.png",
+        }
+
+    def invoke(self, FunctionName: str, Payload: bytes, **kwargs) -> dict:
+        self._call("Invoke")
+        payload = json.loads(Payload)
+
+        if FunctionName.endswith("-get_products_internal"):
+            result = [
+                self._product(payload["tenant_id"], p) for p in payload["product_ids"]
+            ]
+        elif FunctionName.endswith("-get_product_internal"):
+            result = self._product(payload["tenant_id"], payload["product_id"])
+        else:
+            raise self.exceptions.error("ResourceNotFoundException", "Invoke")
+
+        return {
+            "StatusCode": 200,
+            "Payload": io.BytesIO(json.dumps(result).encode("utf-8")),
+        }
+
+
+class SNS(Service):
+    name = "sns"
+
+    def publish(self, TopicArn: str, Message: str, **kwargs) -> dict:
+        self._call("Publish")
+        return {"MessageId": str(uuid.uuid4())}
+
+    def subscribe(self, TopicArn: str, Protocol: str, Endpoint: str, **kwargs):
+        self._call("Subscribe")
+        return {"SubscriptionArn": f"{TopicArn}:{uuid.uuid4()}"}
+
+
+# Connections in `gone` behave like clients that disconnected without the
+# $disconnect route running.
+class ApiGatewayManagement(Service):
+    name = "apigatewaymanagementapi"
+
+    def __init__(self, calls: Counter):
+        super().__init__(calls)
+        self.gone: set[str] = set()
+        self.messages = 0
+
+    def _connection(self, operation: str, connection_id: str):
+        self._call(operation)
+        if connection_id in self.gone:
+            raise self.exceptions.error("GoneException", operation)
+
+    def post_to_connection(self, ConnectionId: str, Data: Any) -> dict:
+        self._connection("PostToConnection", ConnectionId)
+        self.messages += 1
+        return {}
+
+    def get_connection(self, ConnectionId: str) -> dict:
+        self._connection("GetConnection", ConnectionId)
+        return {"ConnectedAt": "2025-01-01T00:00:00Z"}
+
+    def delete_connection(self, ConnectionId: str) -> dict:
+        self._connection("DeleteConnection", ConnectionId)
+        self.gone.add(ConnectionId)
+        return {}
+
+
+class Stubs:
+    def __init__(self, products: set[str]):
+        self.calls: Counter = Counter()
+        self.dynamodb = DynamoDB(self.calls)
+        self.events = EventBridge(self.calls)
+        self.stepfunctions = StepFunctions(self.calls)
+        self.lambda_ = Lambda(self.calls, products)
+        self.sns = SNS(self.calls)
+        self.apigw = ApiGatewayManagement(self.calls)
+
+    def table(self, basename: str) -> Table:
+        return self.dynamodb.Table(resource_name(basename))
+
+    def install(self):
+        clients.reset()
+        clients.override_resource("dynamodb", self.dynamodb)
+        clients.override_client("dynamodb", DynamoDBClient(self.dynamodb))
+
+        for basename in TABLES:
+            clients.override_table(basename, self.table(basename))
+
+        clients.override_client("events", self.events)
+        clients.override_client("stepfunctions", self.stepfunctions)
+        clients.override_client("lambda", self.lambda_)
+        clients.override_client("sns", self.sns)
+        clients.override_client("apigatewaymanagementapi", self.apigw)
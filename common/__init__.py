@@ -1,10 +1,12 @@
 import json
 import os
-from decimal import Decimal
 from typing import Any
 
 from pydantic import BaseModel, ValidationError
 
+from common.metrics import timed
+from common.serialization import from_json, to_json
+
 PROJECT_NAME = os.environ["PROJECT_NAME"]
 STAGE = os.environ["STAGE"]
 
@@ -15,9 +17,10 @@ def resource_name(basename: str) -> str:
 
 def parse_body[T](model: type[T], event: dict):
     try:
-        body = json.loads(event["body"])
-        return model(**body), None
-    except (KeyError, json.JSONDecodeError, ValidationError):
+        with timed("validation"):
+            body = from_json(event["body"])
+            return model(**body), None
+    except (KeyError, TypeError, json.JSONDecodeError, ValidationError):
         return None, response(400, {"message": "Invalid request body."})
 
 
@@ -25,12 +28,11 @@ def response(status_code: int, body: Any):
     raw_body = None
 
     if body != None:
-        if isinstance(body, BaseModel):
-            raw_body = body.model_dump_json()
-        elif type(body) == str:
-            raw_body = body
-        else:
-            raw_body = to_json(body)
+        with timed("serialization"):
+            if isinstance(body, BaseModel):
+                raw_body = body.model_dump_json()
+            else:
+                raw_body = to_json(body)
 
     return {
         "statusCode": status_code,
@@ -41,14 +43,3 @@ def response(status_code: int, body: Any):
         },
         "body": raw_body,
     }
-
-
-def json_default(obj: dict):
-    if isinstance(obj, Decimal):
-        return float(obj)
-
-    raise TypeError
-
-
-def to_json(obj: dict):
-    return json.dumps(obj, default=json_default)
@@ -0,0 +1,91 @@
+import functools
+import json
+from typing import Any, Callable
+
+# Lets an EventBridge handler also consume an SQS queue that the same rule
+# targets. The wrapped function takes a list of EventBridge events and returns
+# one outcome per event: a result, or the exception that event failed with.
+#
+# Called with a single EventBridge event, the handler behaves as before: it
+# returns the result or raises. Called with an SQS batch, it returns the failed
+# records as batchItemFailures (the event source mapping needs
+# functionResponseType ReportBatchItemFailures), so only those are redelivered.
+
+
+def each(events: list[dict], process: Callable[[dict], Any]) -> list[Any]:
+    outcomes = []
+
+    for event in events:
+        try:
+            outcomes.append(process(event))
+        except Exception as e:
+            outcomes.append(e)
+
+    return outcomes
+
+
+def _failures(records: list[dict], outcomes: list[Any]) -> list[dict]:
+    failed = []
+
+    for i, (record, outcome) in enumerate(zip(records, outcomes)):
+        if isinstance(outcome, Exception):
+            failed.append({"itemIdentifier": record["messageId"]})
+
+            # FIFO queues must not see later messages processed before an
+            # earlier one is retried, so the rest of the batch is failed too.
+            if record.get("eventSourceARN", "").endswith(".fifo"):
+                failed.extend(
+                    {"itemIdentifier": r["messageId"]} for r in records[i + 1 :]
+                )
+                break
+
+    return failed
+
+
+def consumer(process_events: Callable[[list[dict]], list[Any]]):
+    @functools.wraps(process_events)
+    def handler(event, context):
+        if not "Records" in event:
+            outcome = process_events([event])[0]
+
+            if isinstance(outcome, Exception):
+                raise outcome
+
+            return outcome
+
+        records = event["Records"]
+        events: list[dict] = []
+        outcomes: list[Any] = [None] * len(records)
+        positions: dict[str, int] = {}
+        duplicates: dict[int, int] = {}
+        batch: list[int] = []
+
+        for i, record in enumerate(records):
+            try:
+                body = json.loads(record["body"])
+            except (KeyError, ValueError) as e:
+                outcomes[i] = e
+                continue
+
+            # EventBridge and SQS both deliver at least once, so the same event
+            # can show up twice in a batch. It is processed once.
+            event_id = body.get("id") if isinstance(body, dict) else None
+            if event_id != None and event_id in positions:
+                duplicates[i] = positions[event_id]
+                continue
+
+            if event_id != None:
+                positions[event_id] = i
+
+            events.append(body)
+            batch.append(i)
+
+        for i, outcome in zip(batch, process_events(events) if events else []):
+            outcomes[i] = outcome
+
+        for i, original in duplicates.items():
+            outcomes[i] = outcomes[original]
+
+        return {"batchItemFailures": _failures(records, outcomes)}
+
+    return handler
@@ -0,0 +1,97 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.config import Config
+
+from common import PROJECT_NAME, STAGE, to_json
+from common.cache import MISSING, TTLCache
+from common.clients import client
+from common.metrics import count
+
+MAX_CONCURRENT_LOOKUPS = int(os.environ.get("CATALOG_MAX_CONCURRENT_LOOKUPS") or 8)
+PRODUCT_CACHE_SIZE = int(os.environ.get("PRODUCT_CACHE_SIZE") or 1024)
+PRODUCT_CACHE_TTL = float(os.environ.get("PRODUCT_CACHE_TTL") or 300)
+PRODUCT_CACHE_NEGATIVE_TTL = float(os.environ.get("PRODUCT_CACHE_NEGATIVE_TTL") or 30)
+
+LAMBDA_CONFIG = Config(max_pool_connections=MAX_CONCURRENT_LOOKUPS)
+
+# Shared by every warm invocation of the container, keyed by
+# (tenant_id, product_id). Unknown products are cached as None for a shorter
+# time so a newly added product becomes orderable quickly.
+product_cache = TTLCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL)
+
+# Flipped off for the lifetime of the container once the catalog service turns
+# out not to expose the bulk lookup function.
+bulk_lookup_available = True
+
+
+class CatalogError(Exception):
+    pass
+
+
+def _invoke(function_name: str, payload: dict):
+    resp = client("lambda", LAMBDA_CONFIG).invoke(
+        FunctionName=f"{PROJECT_NAME}-catalog-{STAGE}-{function_name}",
+        InvocationType="RequestResponse",
+        Payload=to_json(payload).encode("utf-8"),
+    )
+
+    if not "Payload" in resp or "FunctionError" in resp:
+        raise CatalogError(f"Catalog function '{function_name}' failed.")
+
+    return json.loads(resp["Payload"].read().decode("utf-8"))
+
+
+def _get_product(tenant_id: str, product_id: str) -> dict | None:
+    return _invoke(
+        "get_product_internal", {"tenant_id": tenant_id, "product_id": product_id}
+    )
+
+
+def _fetch_products(tenant_id: str, product_ids: list[str]) -> dict[str, dict | None]:
+    global bulk_lookup_available
+
+    if bulk_lookup_available:
+        try:
+            products = _invoke(
+                "get_products_internal",
+                {"tenant_id": tenant_id, "product_ids": product_ids},
+            )
+        except client("lambda", LAMBDA_CONFIG).exceptions.ResourceNotFoundException:
+            bulk_lookup_available = False
+        else:
+            found = {p["product_id"]: p for p in products or [] if p != None}
+            return {product_id: found.get(product_id) for product_id in product_ids}
+
+    workers = min(MAX_CONCURRENT_LOOKUPS, len(product_ids))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        products = pool.map(lambda pid: _get_product(tenant_id, pid), product_ids)
+        return dict(zip(product_ids, products))
+
+
+def get_products(tenant_id: str, product_ids: list[str]) -> dict[str, dict | None]:
+    products: dict[str, dict | None] = {}
+    missing: list[str] = []
+
+    for product_id in dict.fromkeys(product_ids):
+        cached = product_cache.get((tenant_id, product_id))
+
+        if cached is MISSING:
+            missing.append(product_id)
+        else:
+            products[product_id] = cached
+
+    count("ProductCacheHits", len(products))
+    count("ProductCacheMisses", len(missing))
+
+    if len(missing) > 0:
+        for product_id, product in _fetch_products(tenant_id, missing).items():
+            product_cache.set(
+                (tenant_id, product_id),
+                product,
+                ttl=PRODUCT_CACHE_NEGATIVE_TTL if product == None else None,
+            )
+            products[product_id] = product
+
+    return products
@@ -0,0 +1,124 @@
+import os
+from threading import RLock
+from typing import Any, Callable
+
+import boto3
+from botocore.config import Config
+
+from common import resource_name
+
+MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS") or 32)
+
+# Shared by every client. Keep-alive lets warm invocations reuse connections,
+# and the short connect timeout keeps a bad endpoint from eating the whole
+# Lambda timeout.
+BASE_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=3,
+    retries={"mode": "standard", "max_attempts": 3},
+)
+
+# Clients, resources and tables are only built the first time a handler asks
+# for them and are then reused for the lifetime of the container. Handlers
+# therefore pay nothing for services they don't touch on a given request, e.g.
+# when the request body fails validation.
+_session: boto3.Session | None = None
+_registry: dict[tuple, Any] = {}
+# Stand-ins for a service, used whatever config a caller asks for.
+_overrides: dict[tuple, Any] = {}
+_lock = RLock()
+
+# Run on every new session before any client is built from it. botocore copies
+# the session's event hooks into each client when it is created, so hooks
+# registered later would miss existing clients.
+_session_hooks: list[Callable[[boto3.Session], None]] = []
+
+
+def session() -> boto3.Session:
+    global _session
+
+    if _session == None:
+        with _lock:
+            if _session == None:
+                new_session = boto3.Session()
+                for hook in _session_hooks:
+                    hook(new_session)
+                _session = new_session
+
+    return _session
+
+
+def on_session(hook: Callable[[boto3.Session], None]):
+    with _lock:
+        _session_hooks.append(hook)
+
+        if _session != None:
+            hook(_session)
+
+
+def _get(key: tuple, factory):
+    obj = _registry.get(key)
+
+    if obj == None:
+        with _lock:
+            obj = _registry.get(key)
+            if obj == None:
+                obj = _registry[key] = factory()
+
+    return obj
+
+
+# There is one client per service, config and keyword arguments (e.g.
+# endpoint_url). Configs are compared by identity, so callers should pass a
+# module-level Config rather than building one per call.
+def client(service: str, config: Config | None = None, **kwargs) -> Any:
+    override = _overrides.get(("client", service))
+    if override != None:
+        return override
+
+    merged = BASE_CONFIG.merge(config) if config != None else BASE_CONFIG
+
+    return _get(
+        ("client", service, config, *sorted(kwargs.items())),
+        lambda: session().client(service, config=merged, **kwargs),
+    )
+
+
+def resource(service: str) -> Any:
+    override = _overrides.get(("resource", service))
+    if override != None:
+        return override
+
+    return _get(
+        ("resource", service),
+        lambda: session().resource(service, config=BASE_CONFIG),
+    )
+
+
+def table(basename: str) -> Any:
+    return _get(
+        ("table", basename),
+        lambda: resource("dynamodb").Table(resource_name(basename)),
+    )
+
+
+def override_client(service: str, obj: Any):
+    _overrides[("client", service)] = obj
+
+
+def override_resource(service: str, obj: Any):
+    _overrides[("resource", service)] = obj
+
+
+def override_table(basename: str, obj: Any):
+    _registry[("table", basename)] = obj
+
+
+def reset():
+    global _session
+
+    with _lock:
+        _registry.clear()
+        _overrides.clear()
+        _session = None
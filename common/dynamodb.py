@@ -0,0 +1,164 @@
+import os
+import random
+import time
+from typing import Any
+
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from common import resource_name
+from common.clients import client, resource
+
+BATCH_GET_SIZE = 100
+BATCH_GET_MAX_ATTEMPTS = int(os.environ.get("BATCH_GET_MAX_ATTEMPTS") or 5)
+BATCH_GET_BASE_DELAY = 0.05
+
+BATCH_WRITE_SIZE = 25
+
+CONDITION_ARGUMENTS = [
+    "KeyConditionExpression",
+    "ConditionExpression",
+    "FilterExpression",
+]
+TYPED_ARGUMENTS = ["Key", "Item", "ExclusiveStartKey"]
+TYPED_RESULTS = ["Item", "Attributes", "LastEvaluatedKey"]
+
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+
+class UnprocessedKeys(Exception):
+    pass
+
+
+class UnprocessedItems(Exception):
+    pass
+
+
+def serialize(item: dict) -> dict:
+    return {k: serializer.serialize(v) for k, v in item.items()}
+
+
+def deserialize(item: dict) -> dict:
+    return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+
+# boto3 resources and their Table objects must not be shared between threads;
+# only the low-level client is thread-safe. This takes the same arguments as
+# Table (plain values, boto3 conditions) and returns the same results, but
+# goes through the shared client, so worker threads can use it.
+class TableClient:
+    def __init__(self, basename: str):
+        self.name = resource_name(basename)
+
+    @property
+    def exceptions(self) -> Any:
+        return client("dynamodb").exceptions
+
+    def _call(self, operation: str, **kwargs) -> dict:
+        names = dict(kwargs.pop("ExpressionAttributeNames", {}))
+        values = dict(kwargs.pop("ExpressionAttributeValues", {}))
+        builder = ConditionExpressionBuilder()
+
+        for argument in CONDITION_ARGUMENTS:
+            condition = kwargs.get(argument)
+            if condition == None or isinstance(condition, str):
+                continue
+
+            expression = builder.build_expression(
+                condition, is_key_condition=argument == "KeyConditionExpression"
+            )
+            kwargs[argument] = expression.condition_expression
+            names.update(expression.attribute_name_placeholders)
+            values.update(expression.attribute_value_placeholders)
+
+        for argument in TYPED_ARGUMENTS:
+            if argument in kwargs:
+                kwargs[argument] = serialize(kwargs[argument])
+
+        if len(names) > 0:
+            kwargs["ExpressionAttributeNames"] = names
+        if len(values) > 0:
+            kwargs["ExpressionAttributeValues"] = serialize(values)
+
+        resp = getattr(client("dynamodb"), operation)(TableName=self.name, **kwargs)
+
+        for result in TYPED_RESULTS:
+            if result in resp:
+                resp[result] = deserialize(resp[result])
+        if "Items" in resp:
+            resp["Items"] = [deserialize(item) for item in resp["Items"]]
+
+        return resp
+
+    def get_item(self, **kwargs) -> dict:
+        return self._call("get_item", **kwargs)
+
+    def put_item(self, **kwargs) -> dict:
+        return self._call("put_item", **kwargs)
+
+    def update_item(self, **kwargs) -> dict:
+        return self._call("update_item", **kwargs)
+
+    def delete_item(self, **kwargs) -> dict:
+        return self._call("delete_item", **kwargs)
+
+    def query(self, **kwargs) -> dict:
+        return self._call("query", **kwargs)
+
+    def scan(self, **kwargs) -> dict:
+        return self._call("scan", **kwargs)
+
+
+# Reads every key with BatchGetItem, 100 keys per request. Keys DynamoDB hands
+# back as unprocessed (throttling, 16 MB response limit) are retried with
+# jittered exponential backoff. Items come back in no particular order, and keys
+# that don't exist are simply absent.
+def batch_get(table, keys: list[dict], **kwargs) -> list[dict]:
+    items: list[dict] = []
+
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table.name: {"Keys": keys[start : start + BATCH_GET_SIZE], **kwargs}}
+
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt > 0:
+                time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY * 2**attempt))
+
+            resp = resource("dynamodb").batch_get_item(RequestItems=request)
+            items.extend(resp.get("Responses", {}).get(table.name, []))
+
+            request = resp.get("UnprocessedKeys") or {}
+            if len(request) == 0:
+                break
+        else:
+            raise UnprocessedKeys()
+
+    return items
+
+
+# Deletes every key with BatchWriteItem, 25 keys per request, retrying
+# unprocessed ones like batch_get. Duplicate keys are sent once, since
+# DynamoDB rejects a request that names the same key twice. Goes through the
+# client, so it is safe to call from worker threads.
+def batch_delete(table: TableClient, keys: list[dict]):
+    unique = list({tuple(sorted(key.items())): key for key in keys}.values())
+
+    for start in range(0, len(unique), BATCH_WRITE_SIZE):
+        request = {
+            table.name: [
+                {"DeleteRequest": {"Key": serialize(key)}}
+                for key in unique[start : start + BATCH_WRITE_SIZE]
+            ]
+        }
+
+        for attempt in range(BATCH_GET_MAX_ATTEMPTS):
+            if attempt > 0:
+                time.sleep(random.uniform(0, BATCH_GET_BASE_DELAY * 2**attempt))
+
+            resp = client("dynamodb").batch_write_item(RequestItems=request)
+
+            request = resp.get("UnprocessedItems") or {}
+            if len(request) == 0:
+                break
+        else:
+            raise UnprocessedItems()
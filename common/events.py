@@ -0,0 +1,134 @@
+import os
+import random
+import time
+
+from pydantic import BaseModel
+
+from common import PROJECT_NAME, STAGE, to_json
+from common.clients import client
+from common.metrics import timed
+
+EVENT_SOURCE = f"{PROJECT_NAME}-{STAGE}.orders"
+
+# PutEvents limits: 10 entries and 256 KB per request.
+MAX_ENTRIES = 10
+MAX_REQUEST_SIZE = 256 * 1024
+
+MAX_ATTEMPTS = int(os.environ.get("EVENTS_MAX_ATTEMPTS") or 4)
+BASE_DELAY = 0.05
+
+# Entries failing with any other code (e.g. MalformedDetail) fail again on retry.
+RETRYABLE_ERRORS = {"ThrottlingException", "InternalFailure", "InternalException"}
+
+
+class PublishReport(BaseModel):
+    published: int = 0
+    failed: int = 0
+    retried: int = 0
+    requests: int = 0
+
+
+class PublishError(Exception):
+    def __init__(self, report: PublishReport, entries: list[dict]):
+        super().__init__(f"{report.failed} event(s) could not be published.")
+        self.report = report
+        self.entries = entries
+
+
+# Size as EventBridge counts it towards the request limit.
+def entry_size(entry: dict) -> int:
+    size = sum(
+        len(entry[key].encode("utf-8"))
+        for key in ("Source", "DetailType", "Detail")
+        if key in entry
+    )
+    size += sum(len(r.encode("utf-8")) for r in entry.get("Resources", []))
+
+    if "Time" in entry:
+        size += 14
+
+    return size
+
+
+# Buffers the events of an invocation and sends them in as few PutEvents calls
+# as the limits allow. Entries EventBridge rejects with a transient error are
+# retried on their own with jittered backoff. Anything still failing when the
+# buffer is flushed raises PublishError, so events are never dropped silently.
+class EventPublisher:
+    def __init__(self, source: str = EVENT_SOURCE):
+        self.source = source
+        self.report = PublishReport()
+        self.failed_entries: list[dict] = []
+        self._pending: list[dict] = []
+        self._pending_size = 0
+
+    def put(self, detail_type: str, detail: dict | str):
+        if not isinstance(detail, str):
+            with timed("serialization"):
+                detail = to_json(detail)
+
+        entry = {"Source": self.source, "DetailType": detail_type, "Detail": detail}
+        size = entry_size(entry)
+
+        if size > MAX_REQUEST_SIZE:
+            self.report.failed += 1
+            self.failed_entries.append(entry)
+            return
+
+        if (
+            len(self._pending) == MAX_ENTRIES
+            or self._pending_size + size > MAX_REQUEST_SIZE
+        ):
+            self._send_pending()
+
+        self._pending.append(entry)
+        self._pending_size += size
+
+    def flush(self) -> PublishReport:
+        self._send_pending()
+
+        if len(self.failed_entries) > 0:
+            failed, self.failed_entries = self.failed_entries, []
+            raise PublishError(self.report, failed)
+
+        return self.report
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type == None:
+            self.flush()
+
+    def _send_pending(self):
+        entries, self._pending, self._pending_size = self._pending, [], 0
+
+        for attempt in range(MAX_ATTEMPTS):
+            if len(entries) == 0:
+                return
+
+            if attempt > 0:
+                time.sleep(random.uniform(0, BASE_DELAY * 2**attempt))
+                self.report.retried += len(entries)
+
+            resp = client("events").put_events(Entries=entries)
+            self.report.requests += 1
+
+            if resp.get("FailedEntryCount", 0) == 0:
+                self.report.published += len(entries)
+                return
+
+            retry = []
+            for entry, result in zip(entries, resp["Entries"]):
+                if not "ErrorCode" in result:
+                    self.report.published += 1
+                elif result["ErrorCode"] in RETRYABLE_ERRORS:
+                    retry.append(entry)
+                else:
+                    self.report.failed += 1
+                    self.failed_entries.append(entry)
+
+            entries = retry
+
+        self.report.failed += len(entries)
+        self.failed_entries.extend(entries)
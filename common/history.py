@@ -0,0 +1,42 @@
+import os
+
+from boto3.dynamodb.conditions import Key
+
+from common.clients import table
+from common.dynamodb import TableClient
+from common.pagination import query_page
+from schemas import OrderHistoryEntry, OrderHistoryRecord
+from schemas.storage import decode_history_entry, encode_history_entry
+
+MAX_INLINE_HISTORY = int(os.environ.get("MAX_INLINE_HISTORY") or 20)
+
+
+def history_entry(tenant_id: str, item: dict) -> OrderHistoryEntry:
+    return OrderHistoryEntry(**decode_history_entry(item, {}, tenant_id))
+
+
+def record_transition(tenant_id: str, order_id: str, entry: OrderHistoryEntry):
+    record = OrderHistoryRecord(
+        tenant_id=tenant_id, order_id=order_id, **entry.model_dump()
+    )
+    TableClient("order-history").put_item(
+        Item=encode_history_entry(record.model_dump())
+    )
+
+
+def history_page(
+    tenant_id: str, order_id: str, limit: int, start_key: dict | None = None
+) -> tuple[list[dict], dict | None]:
+    return query_page(
+        table("order-history"),
+        limit,
+        ["tenant_id#order_id", "date"],
+        start_key,
+        KeyConditionExpression=Key("tenant_id#order_id").eq(f"{tenant_id}#{order_id}"),
+        ScanIndexForward=False,
+    )
+
+
+def latest_history(tenant_id: str, order_id: str, limit: int) -> list[dict]:
+    items, _ = history_page(tenant_id, order_id, min(limit, MAX_INLINE_HISTORY))
+    return [history_entry(tenant_id, item).model_dump() for item in items]
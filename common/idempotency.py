@@ -0,0 +1,156 @@
+import functools
+import hashlib
+import os
+import time
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from common import response
+from common.clients import table
+
+HEADER = "idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# Completed responses are replayed for a day. A claim that never completes
+# (e.g. the invocation timed out) blocks retries only until it expires.
+RECORD_TTL = int(os.environ.get("IDEMPOTENCY_TTL") or 24 * 60 * 60)
+IN_PROGRESS_TTL = int(os.environ.get("IDEMPOTENCY_IN_PROGRESS_TTL") or 60)
+
+deserializer = TypeDeserializer()
+
+
+def _header(event: dict) -> str | None:
+    for name, value in (event.get("headers") or {}).items():
+        if name.lower() == HEADER:
+            return value
+
+    return None
+
+
+def _fingerprint(event: dict) -> str:
+    body = event.get("body") or ""
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+# The key claimed by the running invocation, and whether its response has been
+# stored yet. A Lambda container runs one invocation at a time.
+_claim: dict | None = None
+
+
+def _store(scope: str, resp: dict):
+    table("idempotency-keys").update_item(
+        Key={"idempotency_key": scope},
+        UpdateExpression=(
+            "SET #s = :complete, status_code = :status_code, #b = :body, "
+            "expires_at = :expires_at"
+        ),
+        ExpressionAttributeNames={"#s": "status", "#b": "body"},
+        ExpressionAttributeValues={
+            ":complete": "complete",
+            ":status_code": resp["statusCode"],
+            ":body": resp["body"],
+            ":expires_at": int(time.time()) + RECORD_TTL,
+        },
+    )
+
+
+# For handlers whose work can't be repeated once a write has gone through:
+# stores the response right away, so that a retry replays it even if the
+# handler fails afterwards (e.g. publishing an event).
+def complete(resp: dict):
+    if _claim == None or _claim["complete"]:
+        return
+
+    _store(_claim["scope"], resp)
+    _claim["complete"] = True
+
+
+def _replay(record: dict) -> dict:
+    resp = response(int(record["status_code"]), None)
+    resp["headers"]["Idempotent-Replayed"] = "true"
+    resp["body"] = record.get("body")
+    return resp
+
+
+# Makes an HTTP handler safe to retry with an Idempotency-Key header. The first
+# request claims the key with a conditional write. Retries get the stored 2xx
+# response back without running the handler again, or a 409 while the first
+# request is still running. Keys are scoped to the caller, and reusing a key
+# with a different body is rejected. Requests without the header are handled
+# as before.
+def idempotent(handler):
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _claim
+
+        key = _header(event)
+        if key == None:
+            return handler(event, context)
+
+        if key == "" or len(key) > MAX_KEY_LENGTH:
+            return response(400, {"message": "Invalid idempotency key."})
+
+        user = event["requestContext"]["authorizer"]
+        tenant_id = event["pathParameters"]["tenant_id"]
+        scope = f"{tenant_id}#{user['user_id']}#{handler.__module__}#{key}"
+        fingerprint = _fingerprint(event)
+
+        keys = table("idempotency-keys")
+        now = int(time.time())
+
+        try:
+            keys.put_item(
+                Item={
+                    "idempotency_key": scope,
+                    "status": "in_progress",
+                    "fingerprint": fingerprint,
+                    "expires_at": now + IN_PROGRESS_TTL,
+                },
+                ConditionExpression=(
+                    "attribute_not_exists(idempotency_key) OR expires_at < :now"
+                ),
+                ExpressionAttributeValues={":now": now},
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+        except keys.meta.client.exceptions.ConditionalCheckFailedException as e:
+            record = {
+                k: deserializer.deserialize(v) for k, v in e.response["Item"].items()
+            }
+
+            if record["fingerprint"] != fingerprint:
+                return response(
+                    422,
+                    {"message": "Idempotency key was used for a different request."},
+                )
+
+            if record["status"] == "complete":
+                return _replay(record)
+
+            return response(
+                409, {"message": "A request with this idempotency key is in progress."}
+            )
+
+        claim = _claim = {"scope": scope, "complete": False}
+
+        try:
+            resp = handler(event, context)
+        except Exception:
+            if not claim["complete"]:
+                keys.delete_item(Key={"idempotency_key": scope})
+            raise
+        finally:
+            _claim = None
+
+        if claim["complete"]:
+            return resp
+
+        # Only successful responses are kept. Anything else releases the key so
+        # that the client can retry, e.g. after fixing the request.
+        if 200 <= resp["statusCode"] < 300:
+            _store(scope, resp)
+        else:
+            keys.delete_item(Key={"idempotency_key": scope})
+
+        return resp
+
+    return wrapper
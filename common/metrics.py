@@ -0,0 +1,177 @@
+import functools
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+# Only imports the standard library: common/__init__.py imports this module
+# to time validation and serialization.
+
+SAMPLE_RATE = float(os.environ.get("METRICS_SAMPLE_RATE") or 1)
+NAMESPACE = os.environ.get("METRICS_NAMESPACE") or (
+    f"{os.environ.get('PROJECT_NAME')}-{os.environ.get('STAGE')}-orders"
+)
+
+
+class Invocation:
+    def __init__(self, function_name: str, cold_start: bool):
+        self.function_name = function_name
+        self.cold_start = cold_start
+        self.started = time.perf_counter()
+        self.timers: dict[str, float] = {}
+        self.counters: dict[str, int] = {}
+        self.calls: dict[str, list] = {}
+        self.lock = Lock()
+
+    def add_time(self, name: str, seconds: float):
+        with self.lock:
+            self.timers[name] = self.timers.get(name, 0) + seconds
+
+    def add_count(self, name: str, value: int):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_call(self, operation: str, seconds: float, error: bool):
+        with self.lock:
+            count, total, errors = self.calls.get(operation, (0, 0, 0))
+            self.calls[operation] = [count + 1, total + seconds, errors + error]
+
+    # One CloudWatch embedded metric format record. Per-operation AWS metrics
+    # are named "<service>.<Operation>.Count" and "<service>.<Operation>.Time".
+    def record(self, error: bool, status_code: int | None) -> dict:
+        metrics = {
+            "Duration": (time.perf_counter() - self.started) * 1000,
+            "ColdStart": int(self.cold_start),
+            "Error": int(error),
+            "AwsCalls": sum(c[0] for c in self.calls.values()),
+            "AwsTime": sum(c[1] for c in self.calls.values()) * 1000,
+        }
+        units = {"ColdStart": "Count", "Error": "Count", "AwsCalls": "Count"}
+
+        for name, seconds in self.timers.items():
+            metrics[f"{name.title()}Time"] = seconds * 1000
+
+        for name, value in self.counters.items():
+            metrics[name] = value
+            units[name] = "Count"
+
+        for operation, (count, seconds, errors) in sorted(self.calls.items()):
+            metrics[f"{operation}.Count"] = count
+            metrics[f"{operation}.Time"] = seconds * 1000
+            units[f"{operation}.Count"] = "Count"
+            if errors > 0:
+                metrics[f"{operation}.Errors"] = errors
+                units[f"{operation}.Errors"] = "Count"
+
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": NAMESPACE,
+                        "Dimensions": [["Function"]],
+                        "Metrics": [
+                            {"Name": name, "Unit": units.get(name, "Milliseconds")}
+                            for name in metrics
+                        ],
+                    }
+                ],
+            },
+            "Function": self.function_name,
+            "StatusCode": status_code,
+            **metrics,
+        }
+
+
+# A Lambda container runs one invocation at a time, so the invocation being
+# measured is global. AWS calls made from worker threads still count towards it.
+_current: Invocation | None = None
+_cold_start = True
+_hooks_installed = False
+
+
+@contextmanager
+def timed(name: str):
+    invocation = _current
+    if invocation == None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        invocation.add_time(name, time.perf_counter() - start)
+
+
+# Counts something the handler did, e.g. items removed, as a metric of its own.
+def count(name: str, value: int = 1):
+    if _current != None:
+        _current.add_count(name, value)
+
+
+def _before_call(model, context, **kwargs):
+    if _current != None:
+        operation = f"{model.service_model.service_name}.{model.name}"
+        context["metrics"] = (operation, time.perf_counter())
+
+
+def _after_call(context, exception=None, **kwargs):
+    started = context.pop("metrics", None)
+
+    if _current != None and started != None:
+        operation, start = started
+        _current.add_call(operation, time.perf_counter() - start, exception != None)
+
+
+def _register(session):
+    session.events.register("before-call", _before_call, "metrics-before-call")
+    session.events.register("after-call", _after_call, "metrics-after-call")
+    session.events.register("after-call-error", _after_call, "metrics-call-error")
+
+
+def _install_hooks():
+    global _hooks_installed
+
+    if not _hooks_installed:
+        from common import clients
+
+        clients.on_session(_register)
+        _hooks_installed = True
+
+
+# Wraps a Lambda handler and logs one metrics record for a sampled fraction of
+# its invocations (METRICS_SAMPLE_RATE). Cold starts are always recorded.
+def instrumented(handler):
+    _install_hooks()
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _current, _cold_start
+
+        cold_start, _cold_start = _cold_start, False
+
+        if not cold_start and random.random() >= SAMPLE_RATE:
+            return handler(event, context)
+
+        function_name = getattr(context, "function_name", None) or handler.__module__
+        invocation = _current = Invocation(function_name, cold_start)
+        error = False
+        result = None
+
+        try:
+            result = handler(event, context)
+            return result
+        except Exception:
+            error = True
+            raise
+        finally:
+            _current = None
+            status_code = None
+            if isinstance(result, dict):
+                status_code = result.get("statusCode")
+            print(json.dumps(invocation.record(error, status_code)))
+
+    return wrapper
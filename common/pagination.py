@@ -0,0 +1,92 @@
+import base64
+import binascii
+import json
+from decimal import Decimal
+from typing import Iterable
+
+from common import to_json
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(key: dict | None) -> str | None:
+    if key == None:
+        return None
+
+    return base64.urlsafe_b64encode(to_json(key).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    if not cursor:
+        return None
+
+    try:
+        key = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii")), parse_float=Decimal
+        )
+    except (ValueError, binascii.Error):
+        raise InvalidCursor()
+
+    if not isinstance(key, dict):
+        raise InvalidCursor()
+
+    return key
+
+
+def parse_page_size(value: str | None) -> int:
+    try:
+        limit = int(value or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise InvalidCursor()
+
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def query_pages(table, **kwargs) -> Iterable[dict]:
+    while True:
+        resp = table.query(**kwargs)
+        yield from resp.get("Items", [])
+
+        last_key = resp.get("LastEvaluatedKey")
+        if last_key == None:
+            return
+
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+# DynamoDB applies Limit before FilterExpression, so a single query can come
+# back short even though more matching items exist. Keep reading until the page
+# is full or the index is exhausted. When the last read overshoots, the page is
+# truncated and the cursor is rebuilt from the key attributes (table and index
+# keys) of the last item that was kept.
+def query_page(
+    table,
+    limit: int,
+    key_attributes: list[str],
+    start_key: dict | None = None,
+    **kwargs,
+) -> tuple[list[dict], dict | None]:
+    items: list[dict] = []
+
+    if start_key != None:
+        kwargs["ExclusiveStartKey"] = start_key
+
+    while True:
+        resp = table.query(Limit=limit, **kwargs)
+        items.extend(resp.get("Items", []))
+
+        last_key = resp.get("LastEvaluatedKey")
+
+        if len(items) > limit:
+            items = items[:limit]
+            return items, {attr: items[-1][attr] for attr in key_attributes}
+
+        if last_key == None or len(items) == limit:
+            return items, last_key
+
+        kwargs["ExclusiveStartKey"] = last_key
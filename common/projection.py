@@ -0,0 +1,56 @@
+from pydantic import BaseModel
+
+from schemas.storage import USER_ATTRIBUTES
+
+# Always returned so that projected items can still be identified.
+KEY_FIELDS = ["tenant_id", "order_id"]
+
+# Stored history entries may refer to one of the order's assignees instead of
+# embedding the user (see schemas/storage.py), so those are read along with
+# them. project() leaves them out of the response again.
+HISTORY_FIELDS = {"history", "last_transition"}
+
+
+class InvalidFields(Exception):
+    pass
+
+
+def model_fields(model: type[BaseModel]) -> set[str]:
+    return {field.alias or name for name, field in model.model_fields.items()}
+
+
+def parse_fields(query: dict, allowed: set[str]) -> list[str] | None:
+    raw = query.get("fields")
+    if not raw:
+        return None
+
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+
+    if any(field not in allowed for field in fields):
+        raise InvalidFields()
+
+    return list(dict.fromkeys(KEY_FIELDS + fields))
+
+
+# Attribute names such as "status#created_at" cannot appear in a
+# ProjectionExpression directly, so every field goes through a placeholder.
+def projection_params(fields: list[str] | None) -> dict:
+    if fields == None:
+        return {}
+
+    if any(field in HISTORY_FIELDS for field in fields):
+        fields = fields + USER_ATTRIBUTES
+
+    names = {f"#p{i}": field for i, field in enumerate(dict.fromkeys(fields))}
+
+    return {
+        "ProjectionExpression": ", ".join(names),
+        "ExpressionAttributeNames": names,
+    }
+
+
+def project(item: dict, fields: list[str] | None) -> dict:
+    if fields == None:
+        return item
+
+    return {field: item[field] for field in fields if field in item}
@@ -0,0 +1,86 @@
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_default(obj: Any):
+    # DynamoDB returns every number as a Decimal. Integers (quantities,
+    # versions) are written as integers, like the models would.
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+
+    raise TypeError
+
+
+# The C encoder only calls json_default for values it cannot encode itself;
+# enums with a str/int mixin, dicts, lists and primitives never leave C.
+_stdlib_encoder = json.JSONEncoder(
+    default=json_default, separators=(",", ":"), ensure_ascii=False
+)
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return _stdlib_encoder.encode(obj)
+
+
+# orjson natively handles enums and datetimes. It has no Decimal support, so
+# DynamoDB numbers still go through json_default, once per number. They are
+# not converted when items are read: the same items are written back (status
+# transitions, migrations), and boto3 rejects floats.
+def _orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj, default=json_default).decode("utf-8")
+
+
+def _stdlib_loads(raw: str | bytes) -> Any:
+    return json.loads(raw)
+
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+# catch the same exception whichever backend is active.
+def _orjson_loads(raw: str | bytes) -> Any:
+    return orjson.loads(raw)
+
+
+JSON_BACKENDS: dict[str, tuple[Callable[[Any], str], Callable[[str | bytes], Any]]] = {
+    "json": (_stdlib_dumps, _stdlib_loads),
+}
+
+if orjson != None:
+    JSON_BACKENDS["orjson"] = (_orjson_dumps, _orjson_loads)
+
+
+def _default_backend() -> str:
+    requested = os.environ.get("JSON_BACKEND")
+
+    if requested in JSON_BACKENDS:
+        return requested
+
+    return "orjson" if "orjson" in JSON_BACKENDS else "json"
+
+
+JSON_BACKEND = _default_backend()
+
+dumps, loads = JSON_BACKENDS[JSON_BACKEND]
+
+
+def to_json(obj: Any) -> str:
+    return dumps(obj)
+
+
+def from_json(raw: str | bytes) -> Any:
+    return loads(raw)
@@ -0,0 +1,141 @@
+from datetime import datetime, timezone
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import BotoCoreError, ClientError
+
+from common.dynamodb import TableClient
+from common.history import record_transition
+from common.metrics import count
+from schemas import AuthorizedUser, OrderHistoryEntry, OrderStatus, UserRole
+from schemas.storage import encode_history_entry, encode_user
+
+deserializer = TypeDeserializer()
+
+STATUS_REQUIREMENTS = {
+    OrderStatus.cooking: OrderStatus.wait_for_cook,
+    OrderStatus.wait_for_dispatcher: OrderStatus.cooking,
+    OrderStatus.dispatching: OrderStatus.wait_for_dispatcher,
+    OrderStatus.wait_for_deliverer: OrderStatus.dispatching,
+    OrderStatus.delivering: OrderStatus.wait_for_deliverer,
+    OrderStatus.complete: OrderStatus.delivering,
+}
+
+
+ROLE_REQUIREMENTS = {
+    OrderStatus.cooking: UserRole.cook,
+    OrderStatus.wait_for_dispatcher: UserRole.cook,
+    OrderStatus.dispatching: UserRole.dispatcher,
+    OrderStatus.wait_for_deliverer: UserRole.dispatcher,
+    OrderStatus.delivering: UserRole.driver,
+    OrderStatus.complete: UserRole.driver,
+}
+
+
+ASSIGNEE_ATTRIBUTES = {
+    OrderStatus.cooking: "cook",
+    OrderStatus.dispatching: "dispatcher",
+    OrderStatus.delivering: "driver",
+}
+
+
+class TransitionError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+# Checks that the user may move an order to the given status and returns the
+# status the order has to be in for that. Neither depends on the order itself.
+def required_status_for(user: AuthorizedUser, status: OrderStatus) -> OrderStatus:
+    required_status = STATUS_REQUIREMENTS.get(status)
+    required_role = ROLE_REQUIREMENTS.get(status)
+
+    if required_role != None and required_role != user.role:
+        raise TransitionError(403, "Forbidden.")
+
+    if required_status == None:
+        raise TransitionError(409, f"An order status cannot be updated to '{status}'.")
+
+    return required_status
+
+
+# Moves the order to the given status with a single conditional update and
+# returns the stored item as it is after the update. created_at never changes,
+# so callers can read it up front without racing other transitions; the status
+# itself is only checked by the condition.
+def apply_transition(
+    tenant_id: str,
+    order_id: str,
+    created_at: str,
+    user: AuthorizedUser,
+    status: OrderStatus,
+) -> dict:
+    required_status = required_status_for(user, status)
+    # Bulk updates call this from worker threads.
+    orders = TableClient("orders")
+
+    update_expression = """
+        SET #s = :status,
+            #sc = :status_created_at,
+            last_transition = :entry
+    """
+    names = {"#s": "status", "#sc": "status#created_at", "#v": "version"}
+    entry = OrderHistoryEntry(
+        user=user,
+        status=status,
+        date=datetime.now(timezone.utc).isoformat(),
+    )
+
+    values = {
+        ":status": status,
+        ":required_status": required_status,
+        ":status_created_at": f"{status.name}#{created_at}",
+        ":entry": encode_history_entry(entry.model_dump()),
+        ":one": 1,
+    }
+
+    assignee = ASSIGNEE_ATTRIBUTES.get(status)
+    if assignee != None:
+        update_expression += ", #a = :assignee, #idx = :assignee_idx"
+        names["#a"] = assignee
+        names["#idx"] = f"{assignee}_id#created_at"
+        values[":assignee"] = encode_user(user.model_dump())
+        values[":entry"] = encode_history_entry(
+            entry.model_dump(), {assignee: user.model_dump()}
+        )
+        values[":assignee_idx"] = f"{user.user_id}#{created_at}"
+
+    try:
+        update_resp = orders.update_item(
+            Key={"tenant_id": tenant_id, "order_id": order_id},
+            UpdateExpression=update_expression + " ADD #v :one",
+            ConditionExpression="attribute_exists(order_id) AND #s = :required_status",
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except orders.exceptions.ConditionalCheckFailedException as e:
+        old_item = e.response.get("Item")
+
+        if old_item == None:
+            raise TransitionError(404, "Order not found.")
+
+        current_status = OrderStatus(deserializer.deserialize(old_item["status"]))
+
+        raise TransitionError(
+            409,
+            f"Order must be in '{required_status}' status, but is on '{current_status}'.",
+        )
+
+    # Only the writer that won the conditional update records the entry. The
+    # status has already changed by now, so a failed history write must not
+    # fail the request and keep the caller from publishing the event; the
+    # entry is still on the order as last_transition.
+    try:
+        record_transition(tenant_id, order_id, entry)
+    except (BotoCoreError, ClientError):
+        count("HistoryWriteErrors")
+
+    return update_resp["Attributes"]
@@ -1,6 +1,227 @@
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable
+
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from pydantic import BaseModel, ValidationError
+
+from common.clients import client, table
+from common.dynamodb import TableClient, batch_delete
+from common.pagination import query_pages
+from schemas import OrderSubscription, subscription_key
 
 APIGW_DOMAIN = os.environ["AWS_APIGW_DOMAIN"]
 APIGW_STAGE = os.environ["AWS_APIGW_STAGE"]
 
 WEBSOCKET_ENDPOINT = f"https://{APIGW_DOMAIN}/{APIGW_STAGE}"
+
+FANOUT_CONCURRENCY = int(os.environ.get("WEBSOCKET_FANOUT_CONCURRENCY") or 32)
+
+# API Gateway closes every WebSocket connection after two hours, so a
+# subscription expires (through the table's TTL on expires_at) by then. Idle
+# connections are closed earlier, but client keepalives never reach these
+# handlers, so only the sweeper's probe can tell those apart.
+MAX_CONNECTION_DURATION = 2 * 60 * 60
+
+APIGW_CONFIG = Config(
+    max_pool_connections=FANOUT_CONCURRENCY,
+    retries={"max_attempts": 2, "mode": "standard"},
+)
+
+
+def api_gw():
+    return client(
+        "apigatewaymanagementapi", APIGW_CONFIG, endpoint_url=WEBSOCKET_ENDPOINT
+    )
+
+
+class DeliveryReport(BaseModel):
+    delivered: int = 0
+    failed: int = 0
+    pruned: int = 0
+
+
+# connected_at is in milliseconds, as API Gateway reports it.
+def subscription_expiry(connected_at: int) -> int:
+    return connected_at // 1000 + MAX_CONNECTION_DURATION
+
+
+def is_expired(sub: OrderSubscription, now: float | None = None) -> bool:
+    if sub.expires_at == None:
+        return False
+
+    return sub.expires_at <= (now if now != None else time.time())
+
+
+def parse_subscriptions(items: Iterable[dict]) -> Iterable[OrderSubscription]:
+    for item in items:
+        try:
+            yield OrderSubscription(**item)
+        except ValidationError:
+            continue
+
+
+# TTL deletes expired items only eventually, so delivery skips them itself.
+def _subscriptions(key: str) -> Iterable[OrderSubscription]:
+    now = time.time()
+    subs = parse_subscriptions(
+        query_pages(
+            table("ws-order-subscriptions"),
+            KeyConditionExpression=Key("tenant_id#order_id").eq(key),
+        )
+    )
+
+    return (sub for sub in subs if not is_expired(sub, now))
+
+
+# A connection subscribed to both the tenant and the order gets one message,
+# as a snapshot if either subscription asked for one.
+def _merge(
+    tenant_subs: Iterable[OrderSubscription], order_subs: list[OrderSubscription]
+) -> Iterable[OrderSubscription]:
+    by_connection = {sub.connection_id: sub for sub in order_subs}
+
+    for sub in tenant_subs:
+        order_sub = by_connection.pop(sub.connection_id, None)
+
+        if order_sub != None and order_sub.snapshot and not sub.snapshot:
+            yield order_sub
+        else:
+            yield sub
+
+    yield from by_connection.values()
+
+
+# Subscriptions are partitioned by "<tenant_id>#<order_id>", with "*" in place
+# of the order id for tenant-wide watchers, so the subscribers of an order are
+# exactly two partitions and never the whole tenant. The order's partition is
+# read first and kept in memory; the tenant-wide one is streamed.
+def find_subscribers(
+    tenant_id: str, order_id: str | None = None
+) -> Iterable[OrderSubscription]:
+    order_subs = []
+    if order_id != None:
+        order_subs = list(_subscriptions(subscription_key(tenant_id, order_id)))
+
+    yield from _merge(_subscriptions(subscription_key(tenant_id, None)), order_subs)
+
+
+# For handlers that deliver many events in one invocation: each partition is
+# read once, so a batch of orders from one tenant costs one tenant-wide lookup
+# plus one lookup per distinct order. A single event is streamed instead, as
+# find_subscribers does. Connections that deliveries found gone are skipped for
+# the rest of the batch.
+class SubscriberLookup:
+    def __init__(self, events: int):
+        self.cached = events > 1
+        self.gone: set[str] = set()
+        self._partitions: dict[str, list[OrderSubscription]] = {}
+
+    def _partition(self, key: str) -> list[OrderSubscription]:
+        if not key in self._partitions:
+            self._partitions[key] = list(_subscriptions(key))
+
+        return self._partitions[key]
+
+    def find(
+        self, tenant_id: str, order_id: str | None = None
+    ) -> Iterable[OrderSubscription]:
+        if not self.cached:
+            subs = find_subscribers(tenant_id, order_id)
+        else:
+            order_subs = []
+            if order_id != None:
+                order_subs = self._partition(subscription_key(tenant_id, order_id))
+
+            tenant_subs = self._partition(subscription_key(tenant_id, None))
+            subs = _merge(tenant_subs, order_subs)
+
+        return (sub for sub in subs if not sub.connection_id in self.gone)
+
+
+# Goes through the client: _prune runs these lookups on delivery's threads.
+def connection_subscriptions(connection_id: str) -> Iterable[OrderSubscription]:
+    return parse_subscriptions(
+        query_pages(
+            TableClient("ws-order-subscriptions"),
+            IndexName="connection-id-index",
+            KeyConditionExpression=Key("connection_id").eq(connection_id),
+        )
+    )
+
+
+def remove_subscriptions(subs: Iterable[OrderSubscription]):
+    batch_delete(TableClient("ws-order-subscriptions"), [sub.key() for sub in subs])
+
+
+def _post(connection_id: str, data: str) -> bool:
+    try:
+        api_gw().post_to_connection(ConnectionId=connection_id, Data=data)
+    except api_gw().exceptions.GoneException:
+        return False
+
+    return True
+
+
+# A connection that is gone may hold more subscriptions than the one that
+# was delivered to, so all of them are removed.
+def _prune(pool: ThreadPoolExecutor, gone: list[OrderSubscription]):
+    connection_ids = dict.fromkeys(sub.connection_id for sub in gone)
+    lookups = pool.map(
+        lambda connection_id: list(connection_subscriptions(connection_id)),
+        connection_ids,
+    )
+
+    remove_subscriptions(sub for subs in lookups for sub in subs)
+
+
+# Connections found gone are pruned, and added to `gone` if given.
+def deliver(
+    subs: Iterable[OrderSubscription],
+    data: str | Callable[[OrderSubscription], str],
+    gone_connections: set[str] | None = None,
+) -> DeliveryReport:
+    report = DeliveryReport()
+    gone: list[OrderSubscription] = []
+    pending: dict[Future, OrderSubscription] = {}
+
+    def collect(done: Iterable[Future]):
+        for future in done:
+            sub = pending.pop(future)
+
+            try:
+                delivered = future.result()
+            except (BotoCoreError, ClientError):
+                report.failed += 1
+                continue
+
+            if delivered:
+                report.delivered += 1
+            else:
+                report.failed += 1
+                gone.append(sub)
+
+    # Subscriptions are submitted as they are read so that callers can stream
+    # them from paginated queries without holding every page in memory.
+    with ThreadPoolExecutor(max_workers=FANOUT_CONCURRENCY) as pool:
+        for sub in subs:
+            if len(pending) >= FANOUT_CONCURRENCY * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            message = data(sub) if callable(data) else data
+            pending[pool.submit(_post, sub.connection_id, message)] = sub
+
+        collect(wait(pending).done)
+
+        if len(gone) > 0:
+            _prune(pool, gone)
+            report.pruned = len(gone)
+
+        if gone_connections != None:
+            gone_connections.update(sub.connection_id for sub in gone)
+
+    return report
@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+
+from common import parse_body, response
+from common.clients import table
+from common.dynamodb import UnprocessedKeys, batch_get
+from common.metrics import instrumented
+from common.projection import (
+    InvalidFields,
+    model_fields,
+    parse_fields,
+    project,
+    projection_params,
+)
+from schemas import Order
+from schemas.storage import decode_order
+
+ORDER_FIELDS = model_fields(Order)
+
+MAX_ORDERS = 100
+
+
+class BatchGetOrdersRequest(BaseModel):
+    order_ids: list[str] = Field(min_length=1, max_length=MAX_ORDERS)
+
+
+@instrumented
+def handler(event, context):
+    tenant_id = event["pathParameters"]["tenant_id"]
+    query = event.get("queryStringParameters") or {}
+
+    try:
+        fields = parse_fields(query, ORDER_FIELDS)
+    except InvalidFields:
+        return response(400, {"message": "Invalid fields."})
+
+    data, err = parse_body(BatchGetOrdersRequest, event)
+    if err != None:
+        return err
+
+    assert data != None
+
+    # BatchGetItem rejects requests that contain the same key twice.
+    order_ids = list(dict.fromkeys(data.order_ids))
+
+    try:
+        items = batch_get(
+            table("orders"),
+            [{"tenant_id": tenant_id, "order_id": order_id} for order_id in order_ids],
+            **projection_params(fields),
+        )
+    except UnprocessedKeys:
+        return response(503, {"message": "Service unavailable, please retry."})
+
+    found = {item["order_id"]: project(decode_order(item), fields) for item in items}
+
+    # Items line up with the requested IDs, with null for orders that don't
+    # exist in this tenant.
+    return response(
+        200,
+        {
+            "items": [found.get(order_id) for order_id in data.order_ids],
+            "not_found": [order_id for order_id in order_ids if not order_id in found],
+        },
+    )
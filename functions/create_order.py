@@ -1,11 +1,14 @@
-import json
 import uuid
 from datetime import datetime, timezone
 
-import boto3
 from pydantic import BaseModel
 
-from common import PROJECT_NAME, STAGE, parse_body, resource_name, response, to_json
+from common import parse_body, response
+from common.catalog import CatalogError, get_products
+from common.clients import table
+from common.events import EventPublisher
+from common.idempotency import complete, idempotent
+from common.metrics import instrumented
 from schemas import AuthorizedUser, Order, OrderItem, OrderStatus
 
 
@@ -18,13 +21,8 @@ class CreateOrderRequest(BaseModel):
     items: list[CreateOrderRequestItem]
 
 
-events = boto3.client("events")
-dynamodb = boto3.resource("dynamodb")
-orders = dynamodb.Table(resource_name("orders"))
-
-lambda_client = boto3.client("lambda")
-
-
+@instrumented
+@idempotent
 def handler(event, context):
     user = AuthorizedUser(**event["requestContext"]["authorizer"])
     tenant_id = event["pathParameters"]["tenant_id"]
@@ -38,28 +36,22 @@ def handler(event, context):
     if len(data.items) == 0:
         return response(400, {"message": "Order must have at least 1 item."})
 
+    try:
+        products = get_products(tenant_id, [item.product_id for item in data.items])
+    except CatalogError:
+        return response(500, {"message": "Internal server error."})
+
     order_items = []
 
     for item in data.items:
-        resp = lambda_client.invoke(
-            FunctionName=f"{PROJECT_NAME}-catalog-{STAGE}-get_product_internal",
-            InvocationType="RequestResponse",
-            Payload=to_json(
-                {"tenant_id": tenant_id, "product_id": item.product_id}
-            ).encode("utf-8"),
-        )
+        product = products.get(item.product_id)
 
-        if not "Payload" in resp:
-            return response(500, {"message": "Internal server error."})
-
-        payload = json.loads(resp["Payload"].read().decode("utf-8"))
-
-        if payload == None:
+        if product == None:
             return response(400, {"message": "A product does not exist."})
 
         order_items.append(
             OrderItem(
-                product=payload,
+                product=product,
                 quantity=item.quantity,
             )
         )
@@ -79,16 +71,16 @@ def handler(event, context):
         },
     )
 
-    orders.put_item(Item=new_order.model_dump(exclude_none=True))
+    item = new_order.to_item()
 
-    events.put_events(
-        Entries=[
-            {
-                "Source": f"{PROJECT_NAME}-{STAGE}.orders",
-                "DetailType": "order.created",
-                "Detail": new_order.model_dump_json(),
-            }
-        ]
-    )
+    table("orders").put_item(Item=item)
+
+    # The order exists from here on, so a retry must get it back instead of
+    # creating another one, even if publishing the event fails.
+    resp = response(201, new_order)
+    complete(resp)
+
+    with EventPublisher() as events:
+        events.put("order.created", item)
 
-    return response(201, new_order.model_dump_json())
+    return resp
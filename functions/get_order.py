@@ -1,29 +1,154 @@
-import boto3
+import os
 
-from common import resource_name, response
-from schemas import FullOrder
+from botocore.exceptions import ClientError
 
-sfn = boto3.client("stepfunctions")
-dynamodb = boto3.resource("dynamodb")
+from common import response
+from common.cache import MISSING, TTLCache
+from common.clients import client, table
+from common.history import latest_history
+from common.metrics import instrumented
+from common.projection import (
+    InvalidFields,
+    model_fields,
+    parse_fields,
+    project,
+    projection_params,
+)
+from schemas import FullOrder, Order
+from schemas.storage import decode_order
 
-orders = dynamodb.Table(resource_name("orders"))
+ORDER_FIELDS = model_fields(Order)
+FULL_ORDER_FIELDS = model_fields(FullOrder)
 
+DEFAULT_HISTORY_RESULTS = 100
+MAX_HISTORY_RESULTS = 1000
+HISTORY_CACHE_SIZE = int(os.environ.get("EXECUTION_HISTORY_CACHE_SIZE") or 256)
+# Cached pages carry a nextToken, which Step Functions only accepts for 24
+# hours, so they are dropped well before that.
+HISTORY_CACHE_TTL = float(os.environ.get("EXECUTION_HISTORY_CACHE_TTL") or 60 * 60)
 
+TERMINAL_EVENT_TYPES = {
+    "ExecutionSucceeded",
+    "ExecutionFailed",
+    "ExecutionAborted",
+    "ExecutionTimedOut",
+}
+
+# Execution history only stops changing once the execution has finished, so
+# pages are cached only for executions that have been seen in a terminal state.
+terminal_executions = TTLCache(HISTORY_CACHE_SIZE)
+history_pages = TTLCache(HISTORY_CACHE_SIZE, HISTORY_CACHE_TTL)
+
+
+class InvalidHistoryParams(Exception):
+    pass
+
+
+def parse_history_params(query: dict) -> dict:
+    try:
+        max_results = int(query.get("max_results") or DEFAULT_HISTORY_RESULTS)
+    except ValueError:
+        raise InvalidHistoryParams()
+
+    reverse_order = (query.get("reverse_order") or "false").lower()
+    if reverse_order not in ("true", "false"):
+        raise InvalidHistoryParams()
+
+    params = {
+        "maxResults": max(1, min(max_results, MAX_HISTORY_RESULTS)),
+        "reverseOrder": reverse_order == "true",
+    }
+
+    if query.get("next_token"):
+        params["nextToken"] = query["next_token"]
+
+    return params
+
+
+def get_execution_history(execution_arn: str, params: dict) -> dict:
+    page_key = (execution_arn, *sorted(params.items()))
+
+    if terminal_executions.get(execution_arn) is not MISSING:
+        page = history_pages.get(page_key)
+        if page is not MISSING:
+            return page
+
+    resp = client("stepfunctions").get_execution_history(
+        executionArn=execution_arn, **params
+    )
+    page = {"events": resp["events"], "next_token": resp.get("nextToken")}
+
+    if any(e["type"] in TERMINAL_EVENT_TYPES for e in resp["events"]):
+        terminal_executions.set(execution_arn, True)
+
+    if terminal_executions.get(execution_arn) is not MISSING:
+        history_pages.set(page_key, page)
+
+    return page
+
+
+@instrumented
 def handler(event, context):
     tenant_id = event["pathParameters"]["tenant_id"]
     order_id = event["pathParameters"]["order_id"]
+    query = event.get("queryStringParameters") or {}
+
+    try:
+        fields = parse_fields(query, FULL_ORDER_FIELDS)
+    except InvalidFields:
+        return response(400, {"message": "Invalid fields."})
 
-    resp = orders.get_item(Key={"tenant_id": tenant_id, "order_id": order_id})
+    include = (query.get("include") or "").split(",")
+    include_history = "execution_history" in include or (
+        fields != None and "execution_history" in fields
+    )
+
+    try:
+        history_params = parse_history_params(query)
+    except InvalidHistoryParams:
+        return response(400, {"message": "Invalid execution history parameters."})
+
+    try:
+        history_limit = max(0, int(query.get("history") or 0))
+    except ValueError:
+        return response(400, {"message": "Invalid history parameter."})
+
+    stored_fields = None
+    if fields != None:
+        stored_fields = [field for field in fields if field in ORDER_FIELDS]
+        if include_history:
+            fields.append("execution_history")
+            stored_fields.append("execution_arn")
+        if history_limit > 0:
+            fields.append("history")
+            stored_fields.append("history")
+
+    resp = table("orders").get_item(
+        Key={"tenant_id": tenant_id, "order_id": order_id},
+        **projection_params(stored_fields),
+    )
     item: dict | None = resp.get("Item")
 
     if item == None:
         return response(404, {"message": "Order not found."})
 
-    order = FullOrder(**item)
+    if include_history and item.get("execution_arn") != None:
+        try:
+            item["execution_history"] = get_execution_history(
+                item["execution_arn"], history_params
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "InvalidToken":
+                raise
+
+            return response(400, {"message": "Invalid execution history parameters."})
+
+    if history_limit > 0:
+        entries = latest_history(tenant_id, order_id, history_limit)
+        item["history"] = entries or item.get("history", [])[:history_limit]
 
-    if order.execution_arn != None:
-        order.execution_history = sfn.get_execution_history(
-            executionArn=order.execution_arn
-        )
+    if fields != None:
+        return response(200, project(decode_order(item), fields))
 
+    order = FullOrder.from_item(item)
     return response(200, order)
@@ -0,0 +1,104 @@
+from botocore.exceptions import ClientError
+
+from common import response
+from common.clients import table
+from common.history import history_entry, history_page
+from common.metrics import instrumented
+from common.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    parse_page_size,
+)
+from schemas import OrderHistoryEntry
+from schemas.storage import decode_order
+
+
+# Orders written before the history table existed keep their older history
+# inline. Returns it newest first, without entries the table already has, or
+# None if the order doesn't exist.
+def inline_history(
+    tenant_id: str, order_id: str, before: str | None
+) -> list[OrderHistoryEntry] | None:
+    resp = table("orders").get_item(
+        Key={"tenant_id": tenant_id, "order_id": order_id},
+        ProjectionExpression="tenant_id, history, client, cook, dispatcher, driver",
+    )
+    item: dict | None = resp.get("Item")
+
+    if item == None:
+        return None
+
+    # Inline entries were prepended, so they are already stored newest first.
+    entries = [OrderHistoryEntry(**e) for e in decode_order(item).get("history", [])]
+
+    return [e for e in entries if before == None or e.date < before]
+
+
+@instrumented
+def handler(event, context):
+    tenant_id = event["pathParameters"]["tenant_id"]
+    order_id = event["pathParameters"]["order_id"]
+    query = event.get("queryStringParameters") or {}
+
+    try:
+        limit = parse_page_size(query.get("limit"))
+        last_key = decode_cursor(query.get("last_key"))
+    except InvalidCursor:
+        return response(400, {"message": "Invalid pagination parameters."})
+
+    # Once the table is exhausted, the cursor points into the inline history:
+    # {"inline": <offset>, "before": <oldest date in the table>}.
+    inline_offset = None
+    before = None
+    if last_key != None and "inline" in last_key:
+        inline_offset = last_key["inline"]
+        before = last_key.get("before")
+
+        if type(inline_offset) != int or inline_offset < 0:
+            return response(400, {"message": "Invalid pagination parameters."})
+
+        if before != None and type(before) != str:
+            return response(400, {"message": "Invalid pagination parameters."})
+
+    entries: list[OrderHistoryEntry] = []
+    new_last_key = None
+
+    if inline_offset == None:
+        try:
+            items, new_last_key = history_page(tenant_id, order_id, limit, last_key)
+        except ClientError as e:
+            if last_key == None or e.response["Error"]["Code"] != "ValidationException":
+                raise
+
+            return response(400, {"message": "Invalid pagination parameters."})
+
+        entries = [history_entry(tenant_id, item) for item in items]
+
+        # The table is read newest first, so its last page holds its oldest
+        # entry, or the previous page did if this one is empty.
+        inline_offset = 0
+        if len(items) > 0:
+            before = items[-1]["date"]
+        elif last_key != None:
+            before = last_key.get("date")
+
+    if new_last_key == None:
+        inline = inline_history(tenant_id, order_id, before)
+
+        if inline == None and len(entries) == 0 and last_key == None:
+            return response(404, {"message": "Order not found."})
+
+        end = inline_offset + limit - len(entries)
+        entries += (inline or [])[inline_offset:end]
+
+        if end < len(inline or []):
+            new_last_key = {"inline": end, "before": before}
+
+    return response(
+        200,
+        {
+            "items": [entry.model_dump() for entry in entries],
+            "next_key": encode_cursor(new_last_key),
+        },
+    )
@@ -1,19 +1,44 @@
-import json
-
-import boto3
 from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
 
-from common import resource_name, response, to_json
+from common import response
+from common.clients import table
+from common.metrics import instrumented
+from common.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    parse_page_size,
+    query_page,
+)
+from common.projection import (
+    InvalidFields,
+    model_fields,
+    parse_fields,
+    project,
+    projection_params,
+)
+from schemas import Order
+from schemas.storage import decode_order
 
-dynamodb = boto3.resource("dynamodb")
+ORDER_FIELDS = model_fields(Order)
 
 
+@instrumented
 def handler(event, context):
     tenant_id = event["pathParameters"]["tenant_id"]
     query = event.get("queryStringParameters") or {}
 
-    limit = int(query.get("limit") or 10)
-    last_key = json.loads(query["last_key"]) if "last_key" in query else None
+    try:
+        limit = parse_page_size(query.get("limit"))
+        last_key = decode_cursor(query.get("last_key"))
+    except InvalidCursor:
+        return response(400, {"message": "Invalid pagination parameters."})
+
+    try:
+        fields = parse_fields(query, ORDER_FIELDS)
+    except InvalidFields:
+        return response(400, {"message": "Invalid fields."})
 
     status = query.get("status") or ""
     client_id = query.get("client_id")
@@ -21,80 +46,86 @@ def handler(event, context):
     dispatcher_id = query.get("dispatcher_id")
     driver_id = query.get("driver_id")
 
-    orders = dynamodb.Table(resource_name("orders"))
-
     if client_id != None:
-        resp = orders.query(
-            IndexName="tenant-client-idx",
-            KeyConditionExpression=(
+        sort_key = "client_id#created_at"
+        params = {
+            "IndexName": "tenant-client-idx",
+            "KeyConditionExpression": (
                 Key("tenant_id").eq(tenant_id)
                 & Key("client_id#created_at").begins_with(f"{client_id}#")
             ),
-            ScanIndexForward=True,
-        )
+        }
     elif cook_id != None:
-        resp = orders.query(
-            IndexName="tenant-cook-idx",
-            KeyConditionExpression=(
+        sort_key = "cook_id#created_at"
+        params = {
+            "IndexName": "tenant-cook-idx",
+            "KeyConditionExpression": (
                 Key("tenant_id").eq(tenant_id)
                 & Key("cook_id#created_at").begins_with(f"{cook_id}#")
             ),
-            ScanIndexForward=True,
-            FilterExpression=Attr("status").begins_with(status),
-        )
+            "FilterExpression": Attr("status").begins_with(status),
+        }
     elif dispatcher_id != None:
-        resp = orders.query(
-            IndexName="tenant-dispatcher-idx",
-            KeyConditionExpression=(
+        sort_key = "dispatcher_id#created_at"
+        params = {
+            "IndexName": "tenant-dispatcher-idx",
+            "KeyConditionExpression": (
                 Key("tenant_id").eq(tenant_id)
                 & Key("dispatcher_id#created_at").begins_with(f"{dispatcher_id}#")
             ),
-            ScanIndexForward=True,
-            FilterExpression=Attr("status").begins_with(status),
-        )
+            "FilterExpression": Attr("status").begins_with(status),
+        }
     elif driver_id != None:
-        resp = orders.query(
-            IndexName="tenant-driver-idx",
-            KeyConditionExpression=(
+        sort_key = "driver_id#created_at"
+        params = {
+            "IndexName": "tenant-driver-idx",
+            "KeyConditionExpression": (
                 Key("tenant_id").eq(tenant_id)
                 & Key("driver_id#created_at").begins_with(f"{driver_id}#")
             ),
-            ScanIndexForward=True,
-            FilterExpression=Attr("status").begins_with(status),
-        )
+            "FilterExpression": Attr("status").begins_with(status),
+        }
     elif status:
-        resp = orders.query(
-            IndexName="tenant-status-idx",
-            KeyConditionExpression=(
+        sort_key = "status#created_at"
+        params = {
+            "IndexName": "tenant-status-idx",
+            "KeyConditionExpression": (
                 Key("tenant_id").eq(tenant_id)
                 & Key("status#created_at").begins_with(f"{status}#")
             ),
-            ScanIndexForward=True,
-        )
-    elif last_key:
-        resp = orders.query(
-            IndexName="tenant-created-at-idx",
-            KeyConditionExpression=Key("tenant_id").eq(tenant_id),
-            ScanIndexForward=True,
-            ExclusiveStartKey=last_key,
-            Limit=limit,
-        )
+        }
     else:
-        resp = orders.query(
-            IndexName="tenant-created-at-idx",
-            KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+        sort_key = "created_at"
+        params = {
+            "IndexName": "tenant-created-at-idx",
+            "KeyConditionExpression": Key("tenant_id").eq(tenant_id),
+        }
+
+    key_attributes = ["tenant_id", "order_id", sort_key]
+
+    if fields != None:
+        params.update(projection_params(fields + key_attributes))
+
+    try:
+        items, new_last_key = query_page(
+            table("orders"),
+            limit,
+            key_attributes,
+            last_key,
             ScanIndexForward=True,
-            Limit=limit,
+            **params,
         )
+    except ClientError as e:
+        # A cursor issued for a different filter does not match this index.
+        if last_key == None or e.response["Error"]["Code"] != "ValidationException":
+            raise
 
-    orders = resp["Items"]
-
-    new_last_key = resp.get("LastEvaluatedKey")
+        return response(400, {"message": "Invalid pagination parameters."})
 
     return response(
         200,
         {
-            "items": orders,
-            "next_key": to_json(new_last_key) if new_last_key else None,
+            "items": [project(decode_order(item), fields) for item in items],
+            "next_key": encode_cursor(new_last_key),
         },
     )
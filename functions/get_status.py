@@ -1,5 +1,7 @@
 from common import response
+from common.metrics import instrumented
 
 
+@instrumented
 def handler(event, context):
     return response(200, {"status": "OK"})
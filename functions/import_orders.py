@@ -0,0 +1,247 @@
+import base64
+import io
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Iterable, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from common import from_json, response
+from common.catalog import CatalogError, get_products
+from common.clients import client
+from common.dynamodb import TableClient
+from common.events import EventPublisher, PublishError
+from common.metrics import count, instrumented
+from schemas import AuthorizedUser, Order, OrderItem, OrderStatus, User, UserRole
+
+# Orders are resolved this many at a time, with one catalog lookup per chunk.
+CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE") or 25)
+WRITE_CONCURRENCY = int(os.environ.get("IMPORT_WRITE_CONCURRENCY") or 8)
+MAX_REPORTED_ERRORS = 100
+
+# Stops reading this long before the function (and API Gateway) times out.
+# The response then has the line to resume from in next_line.
+DEADLINE_MARGIN_MS = int(os.environ.get("IMPORT_DEADLINE_MARGIN_MS") or 5_000)
+
+EVENT_MODES = ("publish", "none")
+
+
+class ImportOrderItem(BaseModel):
+    product_id: str
+    quantity: int
+
+
+class ImportOrderRecord(BaseModel):
+    order_id: Optional[str] = None
+    client: User
+    items: list[ImportOrderItem]
+    status: OrderStatus = OrderStatus.wait_for_cook
+    created_at: Optional[str] = None
+
+
+class InvalidRecord(Exception):
+    pass
+
+
+class InvalidSource(Exception):
+    pass
+
+
+# Lines are read lazily, so an S3 object is streamed instead of being loaded
+# into memory. Line numbers start at 1 and count blank lines.
+def read_lines(
+    event: dict, source: str | None, start_line: int = 1
+) -> Iterable[tuple[int, str]]:
+    if source != None:
+        if not source.startswith("s3://") or not "/" in source[5:]:
+            raise InvalidSource()
+
+        bucket, key = source[5:].split("/", 1)
+        body = client("s3").get_object(Bucket=bucket, Key=key)["Body"]
+        lines = (line.decode("utf-8") for line in body.iter_lines())
+    else:
+        raw = event.get("body") or ""
+        if event.get("isBase64Encoded"):
+            raw = base64.b64decode(raw).decode("utf-8")
+        lines = io.StringIO(raw)
+
+    for number, line in enumerate(lines, start=1):
+        if number >= start_line and line.strip():
+            yield number, line
+
+
+def parse_record(tenant_id: str, line: str) -> ImportOrderRecord:
+    try:
+        record = ImportOrderRecord(**from_json(line))
+    except (TypeError, ValueError, ValidationError):
+        raise InvalidRecord("Invalid order record.")
+
+    if record.client.tenant_id != tenant_id:
+        raise InvalidRecord("Client belongs to another tenant.")
+
+    if len(record.items) == 0:
+        raise InvalidRecord("Order must have at least 1 item.")
+
+    return record
+
+
+def build_order(tenant_id: str, record: ImportOrderRecord, products: dict) -> Order:
+    order_items = []
+
+    for item in record.items:
+        product = products.get(item.product_id)
+
+        if product == None:
+            raise InvalidRecord(f"Product '{item.product_id}' does not exist.")
+
+        order_items.append(OrderItem(product=product, quantity=item.quantity))
+
+    created_at = record.created_at or datetime.now(timezone.utc).isoformat()
+
+    return Order(
+        **{
+            "tenant_id": tenant_id,
+            "order_id": record.order_id or str(uuid.uuid4()),
+            "client": record.client.model_dump(),
+            "items": order_items,
+            "status": record.status,
+            "status#created_at": f"{record.status.name}#{created_at}",
+            "created_at": created_at,
+            "client_id#created_at": f"{record.client.user_id}#{created_at}",
+        },
+    )
+
+
+@instrumented
+def handler(event, context):
+    user = AuthorizedUser(**event["requestContext"]["authorizer"])
+    tenant_id = event["pathParameters"]["tenant_id"]
+    query = event.get("queryStringParameters") or {}
+
+    if user.role != UserRole.admin:
+        return response(403, {"message": "Forbidden."})
+
+    event_mode = query.get("events") or "publish"
+    if not event_mode in EVENT_MODES:
+        return response(400, {"message": "Invalid events parameter."})
+
+    try:
+        start_line = int(query.get("start_line") or 1)
+    except ValueError:
+        return response(400, {"message": "Invalid start_line parameter."})
+
+    if start_line < 1:
+        return response(400, {"message": "Invalid start_line parameter."})
+
+    def out_of_time() -> bool:
+        if context == None:
+            return False
+
+        return context.get_remaining_time_in_millis() < DEADLINE_MARGIN_MS
+
+    try:
+        lines = read_lines(event, query.get("source"), start_line)
+        first_chunk = list(islice(lines, CHUNK_SIZE))
+    except InvalidSource:
+        return response(400, {"message": "Invalid source."})
+    except client("s3").exceptions.NoSuchKey:
+        return response(404, {"message": "Source not found."})
+
+    summary = {"read": 0, "imported": 0, "failed": 0, "errors": [], "next_line": None}
+
+    def fail(line_number: int, message: str):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append({"line": line_number, "message": message})
+
+    events = EventPublisher()
+    # Writes run on worker threads, so they go through the client.
+    orders_table = TableClient("orders")
+    chunk = first_chunk
+
+    while len(chunk) > 0:
+        records: list[tuple[int, ImportOrderRecord]] = []
+
+        for line_number, line in chunk:
+            summary["read"] += 1
+            try:
+                records.append((line_number, parse_record(tenant_id, line)))
+            except InvalidRecord as e:
+                fail(line_number, str(e))
+
+        product_ids = [i.product_id for _, r in records for i in r.items]
+
+        try:
+            products = get_products(tenant_id, product_ids) if records else {}
+        except CatalogError:
+            for line_number, _ in records:
+                fail(line_number, "Catalog lookup failed.")
+            records = []
+
+        orders = []
+        for line_number, record in records:
+            try:
+                orders.append((line_number, build_order(tenant_id, record, products)))
+            except InvalidRecord as e:
+                fail(line_number, str(e))
+            except ValidationError:
+                fail(line_number, "Invalid order.")
+
+        # Orders that already exist are left alone, so replaying an import
+        # can't reset an order that has moved on since. Within a chunk the
+        # first line with an order_id wins.
+        def write(order: Order) -> bool:
+            try:
+                orders_table.put_item(
+                    Item=order.to_item(),
+                    ConditionExpression="attribute_not_exists(order_id)",
+                )
+            except orders_table.exceptions.ConditionalCheckFailedException:
+                return False
+
+            return True
+
+        created = []
+        if len(orders) > 0:
+            workers = min(WRITE_CONCURRENCY, len(orders))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                written = list(pool.map(write, [order for _, order in orders]))
+
+            for (line_number, order), ok in zip(orders, written):
+                if ok:
+                    created.append(order)
+                else:
+                    fail(line_number, "Order already exists.")
+
+        summary["imported"] += len(created)
+
+        # Orders are written before their events go out, so consumers always
+        # find them stored. Orders imported past their initial status are
+        # history: starting their workflow or announcing them as new would be
+        # wrong.
+        if event_mode == "publish":
+            for order in created:
+                if order.status == OrderStatus.wait_for_cook:
+                    events.put("order.created", order.to_item())
+
+        chunk = list(islice(lines, CHUNK_SIZE))
+
+        if len(chunk) > 0 and out_of_time():
+            summary["next_line"] = chunk[0][0]
+            break
+
+    try:
+        summary["events"] = events.flush().model_dump()
+    except PublishError as e:
+        summary["events"] = e.report.model_dump()
+
+    summary["errors"].sort(key=lambda error: error["line"])
+
+    count("OrdersRead", summary["read"])
+    count("OrdersImported", summary["imported"])
+    count("OrdersFailed", summary["failed"])
+
+    return response(200, summary)
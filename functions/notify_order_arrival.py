@@ -1,34 +1,32 @@
 import os
 
-import boto3
-
-from common import resource_name
-from schemas import Order
+from common.clients import client, table
+from common.metrics import instrumented
+from schemas import AuthorizedUser, OrderItem
+from schemas.storage import decode_order
 
 TOPIC_ARN = os.environ["ORDER_ARRIVALS_TOPIC_ARN"]
 
 
-dynamodb = boto3.resource("dynamodb")
-sns = boto3.client("sns")
-
-orders = dynamodb.Table(resource_name("orders"))
-
-
+@instrumented
 def handler(event, context):
-    resp = orders.get_item(
-        Key={"tenant_id": event["tenant_id"], "order_id": event["order_id"]}
+    # Only the client and the line items are needed for the notification.
+    resp = table("orders").get_item(
+        Key={"tenant_id": event["tenant_id"], "order_id": event["order_id"]},
+        ProjectionExpression="#t, #c, #i",
+        ExpressionAttributeNames={"#t": "tenant_id", "#c": "client", "#i": "items"},
     )
 
     item: dict | None = resp.get("Item")
 
     if item != None:
-        order = Order(**item)
+        data = decode_order(item)
+        order_client = AuthorizedUser(**data["client"])
+        items = [OrderItem(**i) for i in data["items"]]
 
-        order_items = [
-            f"- {item.product.name} x{item.quantity}" for item in order.items
-        ]
+        order_items = [f"- {item.product.name} x{item.quantity}" for item in items]
 
-        sns.publish(
+        client("sns").publish(
             TopicArn=TOPIC_ARN,
             Subject="¡Tu pedido ha llegado!",
             Message=f"""
@@ -40,11 +38,11 @@ Resumen del pedido:
             MessageAttributes={
                 "tenant_id": {
                     "DataType": "String",
-                    "StringValue": order.client.tenant_id,
+                    "StringValue": order_client.tenant_id,
                 },
                 "user_id": {
                     "DataType": "String",
-                    "StringValue": order.client.user_id,
+                    "StringValue": order_client.user_id,
                 },
             },
         )
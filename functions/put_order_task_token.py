@@ -1,7 +1,7 @@
-import boto3
 from pydantic import BaseModel
 
-from common import resource_name
+from common.clients import table
+from common.metrics import instrumented
 
 
 class PutTaskTokenEvent(BaseModel):
@@ -10,14 +10,11 @@ class PutTaskTokenEvent(BaseModel):
     task_token: str
 
 
-dynamodb = boto3.resource("dynamodb")
-orders = dynamodb.Table(resource_name("orders"))
-
-
+@instrumented
 def handler(event, context):
     data = PutTaskTokenEvent(**event)
 
-    orders.update_item(
+    table("orders").update_item(
         Key={"tenant_id": data.tenant_id, "order_id": data.order_id},
         UpdateExpression="SET task_token = :token",
         ExpressionAttributeValues={":token": data.task_token},
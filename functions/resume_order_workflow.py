@@ -1,7 +1,10 @@
-import boto3
+from botocore.exceptions import BotoCoreError, ClientError
 from pydantic import BaseModel
 
-from common import resource_name, to_json
+from common import to_json
+from common.batch import consumer, each
+from common.clients import client, table
+from common.metrics import instrumented
 from schemas import Order
 
 
@@ -10,32 +13,51 @@ class ResumeOrderWorkflowEvent(BaseModel):
     order_id: str
 
 
-dynamodb = boto3.resource("dynamodb")
-orders = dynamodb.Table(resource_name("orders"))
-
-
-def handler(event, context):
+def resume(event: dict):
     data = ResumeOrderWorkflowEvent(**event["detail"])
-
-    resp = orders.get_item(Key={"tenant_id": data.tenant_id, "order_id": data.order_id})
-    item: dict | None = resp.get("Item")
-
-    if item == None:
-        raise Exception("Order not found")
-
-    order = Order(**item)
-
-    if order.task_token == None:
-        raise Exception("Order workflow is not paused")
-
-    # Remove obsolete task token
-    orders.update_item(
-        Key={"tenant_id": data.tenant_id, "order_id": data.order_id},
-        UpdateExpression="REMOVE task_token",
-    )
-
-    sf = boto3.client("stepfunctions")
-    sf.send_task_success(
-        taskToken=order.task_token,
-        output=to_json(order.model_dump()),
-    )
+    orders = table("orders")
+    key = {"tenant_id": data.tenant_id, "order_id": data.order_id}
+
+    # Removing the token is the claim: of several deliveries of the same event
+    # only one finds it, and the others have nothing left to resume.
+    try:
+        resp = orders.update_item(
+            Key=key,
+            UpdateExpression="REMOVE task_token",
+            ConditionExpression="attribute_exists(task_token)",
+            ReturnValues="UPDATED_OLD",
+        )
+    except orders.meta.client.exceptions.ConditionalCheckFailedException:
+        return
+
+    task_token = resp["Attributes"]["task_token"]
+
+    output = Order.from_item(event["detail"]).model_dump()
+    output["task_token"] = task_token
+
+    try:
+        client("stepfunctions").send_task_success(
+            taskToken=task_token,
+            output=to_json(output),
+        )
+    except (BotoCoreError, ClientError):
+        # Give the token back so that a retry of this event can resume, unless
+        # the workflow has moved on and stored a new one in the meantime.
+        try:
+            orders.update_item(
+                Key=key,
+                UpdateExpression="SET task_token = :token",
+                ConditionExpression=(
+                    "attribute_exists(order_id) AND attribute_not_exists(task_token)"
+                ),
+                ExpressionAttributeValues={":token": task_token},
+            )
+        except orders.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+        raise
+
+
+@instrumented
+@consumer
+def handler(events: list[dict]) -> list:
+    return each(events, resume)
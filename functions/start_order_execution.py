@@ -1,27 +1,29 @@
 import os
 
-import boto3
-
-from common import resource_name
+from common.batch import consumer, each
+from common.clients import client, table
+from common.metrics import instrumented
 from schemas import Order
 
 SFN_ARN = os.environ["AWS_SFN_ARN"]
 
-sfn = boto3.client("stepfunctions")
-dynamodb = boto3.resource("dynamodb")
-orders = dynamodb.Table(resource_name("orders"))
-
 
-def handler(event, context):
-    order = Order(**event["detail"])
+def start_execution(event: dict):
+    order = Order.from_item(event["detail"])
 
-    execution = sfn.start_execution(
+    execution = client("stepfunctions").start_execution(
         stateMachineArn=SFN_ARN,
         input=order.model_dump_json(),
     )
 
-    orders.update_item(
+    table("orders").update_item(
         Key={"tenant_id": order.tenant_id, "order_id": order.order_id},
         UpdateExpression="SET execution_arn = :arn",
         ExpressionAttributeValues={":arn": execution["executionArn"]},
     )
+
+
+@instrumented
+@consumer
+def handler(events: list[dict]) -> list:
+    return each(events, start_execution)
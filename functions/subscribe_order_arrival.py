@@ -1,17 +1,16 @@
 import os
 
-import boto3
-
 from common import to_json
+from common.clients import client
+from common.metrics import instrumented
 
 TOPIC_ARN = os.environ["ORDER_ARRIVALS_TOPIC_ARN"]
 
-sns = boto3.client("sns")
-
 
+@instrumented
 def handler(event, context):
     user = event["detail"]
-    sns.subscribe(
+    client("sns").subscribe(
         TopicArn=TOPIC_ARN,
         Protocol="email",
         Endpoint=user["email"],
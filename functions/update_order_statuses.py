@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import BotoCoreError, ClientError
+from pydantic import BaseModel, Field
+
+from common import parse_body, response
+from common.clients import table
+from common.dynamodb import UnprocessedKeys, batch_get
+from common.events import EventPublisher
+from common.metrics import instrumented
+from common.transitions import (
+    TransitionError,
+    apply_transition,
+    required_status_for,
+)
+from schemas import AuthorizedUser, OrderStatus
+from schemas.storage import decode_order
+
+MAX_ORDERS = int(os.environ.get("BULK_STATUS_UPDATE_MAX_ORDERS") or 25)
+CONCURRENCY = int(os.environ.get("BULK_STATUS_UPDATE_CONCURRENCY") or 8)
+
+
+class UpdateOrderStatusesRequest(BaseModel):
+    order_ids: list[str] = Field(min_length=1, max_length=MAX_ORDERS)
+    status: OrderStatus
+
+
+@instrumented
+def handler(event, context):
+    tenant_id = event["pathParameters"]["tenant_id"]
+
+    data, err = parse_body(UpdateOrderStatusesRequest, event)
+    if err != None:
+        return err
+
+    assert data != None
+
+    user = AuthorizedUser(**event["requestContext"]["authorizer"])
+
+    # The role and status requirements only depend on the target status, so
+    # they either hold for every order in the request or for none.
+    try:
+        required_status_for(user, data.status)
+    except TransitionError as e:
+        return response(e.status_code, {"message": e.message})
+
+    order_ids = list(dict.fromkeys(data.order_ids))
+
+    try:
+        items = batch_get(
+            table("orders"),
+            [{"tenant_id": tenant_id, "order_id": order_id} for order_id in order_ids],
+            ProjectionExpression="order_id, created_at",
+        )
+    except UnprocessedKeys:
+        return response(503, {"message": "Service unavailable, please retry."})
+
+    created_at = {item["order_id"]: item["created_at"] for item in items}
+
+    # Each order is still its own conditional update: a transaction would fail
+    # the whole batch as soon as one order is in the wrong status.
+    def transition(order_id: str) -> tuple[dict, dict | None]:
+        if not order_id in created_at:
+            return {
+                "order_id": order_id,
+                "status_code": 404,
+                "message": "Order not found.",
+            }, None
+
+        try:
+            new_order = apply_transition(
+                tenant_id, order_id, created_at[order_id], user, data.status
+            )
+        except TransitionError as e:
+            return {
+                "order_id": order_id,
+                "status_code": e.status_code,
+                "message": e.message,
+            }, None
+        except (BotoCoreError, ClientError):
+            return {
+                "order_id": order_id,
+                "status_code": 500,
+                "message": "Internal server error.",
+            }, None
+
+        return {
+            "order_id": order_id,
+            "status_code": 200,
+            "order": decode_order(new_order),
+        }, new_order
+
+    workers = min(CONCURRENCY, len(order_ids))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(transition, order_ids))
+
+    with EventPublisher() as events:
+        for _, new_order in outcomes:
+            if new_order != None:
+                events.put("order.status_updated", new_order)
+
+    return response(200, {"results": [result for result, _ in outcomes]})
@@ -1,39 +1,24 @@
-import boto3
-from boto3.dynamodb.conditions import Attr, Key
+from common.batch import consumer, each
+from common.metrics import instrumented
+from common.websocket import SubscriberLookup, deliver
+from schemas import Order, WebSocketMessage, WebSocketMessageKind
 
-from common import resource_name
-from common.websocket import WEBSOCKET_ENDPOINT
-from schemas import Order, OrderSubscription, WebSocketMessage, WebSocketMessageKind
 
-dynamodb = boto3.resource("dynamodb")
-subscriptions = dynamodb.Table(resource_name("ws-order-subscriptions"))
-api_gw = boto3.client("apigatewaymanagementapi", endpoint_url=WEBSOCKET_ENDPOINT)
-
-
-def handler(event, context):
-    order = Order(**event["detail"])
+def broadcast(event: dict, subscribers: SubscriberLookup) -> dict:
+    order = Order.from_item(event["detail"])
     message = WebSocketMessage(
         kind=WebSocketMessageKind.order_created,
         data=order.model_dump(),
     )
     message_data = message.model_dump_json()
 
-    resp = subscriptions.query(
-        KeyConditionExpression=Key("tenant_id").eq(order.tenant_id),
-        FilterExpression=(
-            Attr("order_id").eq(order.order_id) | Attr("order_id").eq(None)
-        ),
-    )
-
-    items: list[dict] = resp["Items"]
+    subs = subscribers.find(order.tenant_id, order.order_id)
+    report = deliver(subs, message_data, subscribers.gone)
+    return report.model_dump()
 
-    for item in items:
-        try:
-            sub = OrderSubscription(**item)
 
-            api_gw.post_to_connection(
-                ConnectionId=sub.connection_id,
-                Data=message_data,
-            )
-        except:
-            pass
+@instrumented
+@consumer
+def handler(events: list[dict]) -> list:
+    subscribers = SubscriberLookup(len(events))
+    return each(events, lambda event: broadcast(event, subscribers))
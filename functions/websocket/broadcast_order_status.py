@@ -1,43 +1,71 @@
-import os
+from functools import cache
 
-import boto3
-from boto3.dynamodb.conditions import Attr, Key
+from common.batch import consumer, each
+from common.metrics import instrumented
+from common.websocket import SubscriberLookup, deliver
+from schemas import (
+    Order,
+    OrderStatusUpdate,
+    OrderSubscription,
+    WebSocketMessage,
+    WebSocketMessageKind,
+)
 
-from common import resource_name
-from common.websocket import WEBSOCKET_ENDPOINT
-from schemas import Order, OrderSubscription, WebSocketMessage, WebSocketMessageKind
 
-dynamodb = boto3.resource("dynamodb")
-subscriptions = dynamodb.Table(resource_name("ws-order-subscriptions"))
-api_gw = boto3.client("apigatewaymanagementapi", endpoint_url=WEBSOCKET_ENDPOINT)
+def broadcast(event: dict, subscribers: SubscriberLookup) -> dict:
+    # Most subscribers only get the delta, which needs a handful of attributes,
+    # so the full order model is only built if someone asked for snapshots.
+    data = Order.decode_trusted(event["detail"])
 
+    latest = data.get("last_transition")
 
-def handler(event, context):
-    order = Order(**event["detail"])
+    # Orders from before the history table prepend entries to an inline list.
+    if latest == None and len(data.get("history", [])) > 0:
+        latest = data["history"][0]
 
-    message = WebSocketMessage(
-        kind=WebSocketMessageKind.order_status_updated,
-        data=order.model_dump(),
+    update = OrderStatusUpdate(
+        tenant_id=data["tenant_id"],
+        order_id=data["order_id"],
+        status=data["status"],
+        actor=latest["user"] if latest != None else None,
+        date=latest["date"] if latest != None else None,
+        version=data.get("version", 0),
     )
-    message_data = message.model_dump_json()
+    update_data = WebSocketMessage(
+        kind=WebSocketMessageKind.order_status_updated,
+        data=update.model_dump(),
+    ).model_dump_json()
 
-    resp = subscriptions.query(
-        KeyConditionExpression=Key("tenant_id").eq(order.tenant_id),
-        FilterExpression=(
-            Attr("order_id").eq(order.order_id) | Attr("order_id").eq(None)
-        ),
-    )
+    @cache
+    def snapshot_data():
+        return WebSocketMessage(
+            kind=WebSocketMessageKind.order_status_updated,
+            data=Order(**data).model_dump(),
+        ).model_dump_json()
+
+    def message_for(sub: OrderSubscription) -> str:
+        return snapshot_data() if sub.snapshot else update_data
 
-    items: list[dict] = resp["Items"]
+    subs = subscribers.find(update.tenant_id, update.order_id)
+    report = deliver(subs, message_for, subscribers.gone)
+    return report.model_dump()
+
+
+@instrumented
+@consumer
+def handler(events: list[dict]) -> list:
+    subscribers = SubscriberLookup(len(events))
+
+    # Updates of the same order go out in the order they were made, even if
+    # the queue delivered them out of order.
+    ordering = sorted(
+        range(len(events)),
+        key=lambda i: int(events[i].get("detail", {}).get("version", 0)),
+    )
+    outcomes = each([events[i] for i in ordering], lambda e: broadcast(e, subscribers))
 
-    for item in items:
-        try:
-            sub = OrderSubscription(**item)
+    results = [None] * len(events)
+    for i, outcome in zip(ordering, outcomes):
+        results[i] = outcome
 
-            if sub.order_id == None or sub.order_id == order.order_id:
-                api_gw.post_to_connection(
-                    ConnectionId=sub.connection_id,
-                    Data=message_data,
-                )
-        except:
-            pass
+    return results
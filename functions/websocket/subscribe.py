@@ -1,22 +1,24 @@
-from typing import Optional
+import os
 
-import boto3
-from boto3.dynamodb.conditions import Key
-from pydantic import BaseModel
+from common import parse_body, response
+from common.clients import table
+from common.metrics import instrumented
+from common.websocket import connection_subscriptions, subscription_expiry
+from schemas import (
+    OrderSubscription,
+    SubscriptionTargets,
+    WebSocketMessage,
+    WebSocketMessageKind,
+)
 
-from common import parse_body, resource_name, response
-from schemas import OrderSubscription, WebSocketMessage, WebSocketMessageKind
+MAX_SUBSCRIPTIONS = int(os.environ.get("WEBSOCKET_MAX_SUBSCRIPTIONS") or 100)
 
 
-class SubscribeRequest(BaseModel):
-    tenant_id: str
-    order_id: Optional[str]
-
-
-dynamodb = boto3.resource("dynamodb")
-subscriptions = dynamodb.Table(resource_name("ws-order-subscriptions"))
+class SubscribeRequest(SubscriptionTargets):
+    snapshot: bool = False
 
 
+@instrumented
 def handler(event, context):
     data, err = parse_body(SubscribeRequest, event)
     if err != None:
@@ -27,30 +29,37 @@ def handler(event, context):
     connection_id = event["requestContext"]["connectionId"]
     connected_at = event["requestContext"]["connectedAt"]
 
-    resp = subscriptions.query(
-        IndexName="connection-id-index",
-        KeyConditionExpression=Key("connection_id").eq(connection_id),
-        Limit=1,
-    )
+    new_subscriptions = [
+        OrderSubscription(
+            tenant_id=data.tenant_id,
+            order_id=order_id,
+            connection_id=connection_id,
+            connected_at=connected_at,
+            snapshot=data.snapshot,
+            expires_at=subscription_expiry(connected_at),
+        )
+        for order_id in data.targets()
+    ]
 
-    if resp["Count"] > 0:
+    # Subscribing again to the same order only updates the snapshot flag.
+    existing = {
+        sub.tenant_id_order_id for sub in connection_subscriptions(connection_id)
+    }
+    added = {sub.tenant_id_order_id for sub in new_subscriptions} - existing
+
+    if len(existing) + len(added) > MAX_SUBSCRIPTIONS:
         res = WebSocketMessage(
             kind=WebSocketMessageKind.subscription_failed,
-            data={"message": "Already subscribed."},
+            data={"message": "Too many subscriptions."},
         )
         return response(409, res)
 
-    new_subscription = OrderSubscription(
-        tenant_id=data.tenant_id,
-        order_id=data.order_id,
-        connection_id=connection_id,
-        connected_at=connected_at,
-    )
-
-    subscriptions.put_item(Item=new_subscription.model_dump())
+    with table("ws-order-subscriptions").batch_writer() as batch:
+        for sub in new_subscriptions:
+            batch.put_item(Item=sub.model_dump())
 
     res = WebSocketMessage(
         kind=WebSocketMessageKind.subscription_success,
-        data={"message": "Subscribed."},
+        data={"message": "Subscribed.", "order_ids": data.targets()},
     )
     return response(200, res)
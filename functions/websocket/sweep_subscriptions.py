@@ -0,0 +1,122 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+
+from botocore.exceptions import BotoCoreError, ClientError
+from pydantic import BaseModel
+
+from common.dynamodb import TableClient
+from common.metrics import count, instrumented
+from common.websocket import (
+    FANOUT_CONCURRENCY,
+    api_gw,
+    is_expired,
+    parse_subscriptions,
+    remove_subscriptions,
+)
+
+SEGMENTS = int(os.environ.get("SUBSCRIPTION_SWEEP_SEGMENTS") or 4)
+
+# Stops scanning this long before the function times out. Whatever is left is
+# swept by the next run.
+DEADLINE_MARGIN_MS = 10_000
+
+
+class SweepReport(BaseModel):
+    scanned: int = 0
+    expired: int = 0
+    gone: int = 0
+    probed: int = 0
+
+
+class Sweep:
+    def __init__(self, context):
+        self.context = context
+        self.report = SweepReport()
+        self.lock = Lock()
+        # A connection's subscriptions are spread over the whole table, so
+        # probes are shared by every segment, including ones still in flight.
+        self.probes: dict[str, Future] = {}
+
+    def out_of_time(self) -> bool:
+        if self.context == None:
+            return False
+
+        return self.context.get_remaining_time_in_millis() < DEADLINE_MARGIN_MS
+
+    def _probe(self, connection_id: str) -> bool:
+        try:
+            api_gw().get_connection(ConnectionId=connection_id)
+        except api_gw().exceptions.GoneException:
+            return False
+        except (BotoCoreError, ClientError):
+            # Not known to be gone: kept until a later run can tell.
+            pass
+
+        return True
+
+    # Probes the connections of one page in parallel, each at most once per run.
+    def probe(self, pool: ThreadPoolExecutor, connection_ids: set[str]) -> set[str]:
+        with self.lock:
+            for connection_id in connection_ids:
+                if not connection_id in self.probes:
+                    self.probes[connection_id] = pool.submit(self._probe, connection_id)
+                    self.report.probed += 1
+
+            probes = {c: self.probes[c] for c in connection_ids}
+
+        return {c for c, probe in probes.items() if not probe.result()}
+
+    def segment(self, segment: int, pool: ThreadPoolExecutor):
+        # Segments run on their own threads, so they scan through the client.
+        subscriptions = TableClient("ws-order-subscriptions")
+        kwargs = {"Segment": segment, "TotalSegments": SEGMENTS}
+
+        while not self.out_of_time():
+            resp = subscriptions.scan(**kwargs)
+            subs = list(parse_subscriptions(resp.get("Items", [])))
+            now = time.time()
+
+            expired = [sub for sub in subs if is_expired(sub, now)]
+            live = [sub for sub in subs if not is_expired(sub, now)]
+
+            dead = self.probe(pool, {sub.connection_id for sub in live})
+            gone = [sub for sub in live if sub.connection_id in dead]
+
+            remove_subscriptions(expired + gone)
+
+            with self.lock:
+                self.report.scanned += resp.get("ScannedCount", len(subs))
+                self.report.expired += len(expired)
+                self.report.gone += len(gone)
+
+            if not "LastEvaluatedKey" in resp:
+                break
+
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+# Scheduled clean-up of subscriptions whose $disconnect never ran. Expired rows
+# are removed right away (TTL may take days to get to them), and the
+# connections of the rest are probed so that dead ones are removed too.
+@instrumented
+def handler(event, context):
+    sweep = Sweep(context)
+
+    with ThreadPoolExecutor(max_workers=FANOUT_CONCURRENCY) as pool:
+        with ThreadPoolExecutor(max_workers=SEGMENTS) as segments:
+            for result in [
+                segments.submit(sweep.segment, segment, pool)
+                for segment in range(SEGMENTS)
+            ]:
+                result.result()
+
+    report = sweep.report
+    count("SubscriptionsScanned", report.scanned)
+    count("SubscriptionsExpired", report.expired)
+    count("SubscriptionsGone", report.gone)
+    count("SubscriptionsRemoved", report.expired + report.gone)
+    count("ConnectionsProbed", report.probed)
+
+    return report.model_dump()
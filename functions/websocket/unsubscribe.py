@@ -0,0 +1,39 @@
+from common import parse_body, response
+from common.metrics import instrumented
+from common.websocket import remove_subscriptions
+from schemas import (
+    OrderSubscription,
+    SubscriptionTargets,
+    WebSocketMessage,
+    WebSocketMessageKind,
+)
+
+
+@instrumented
+def handler(event, context):
+    data, err = parse_body(SubscriptionTargets, event)
+    if err != None:
+        return err
+
+    assert data != None
+
+    connection_id = event["requestContext"]["connectionId"]
+    connected_at = event["requestContext"]["connectedAt"]
+
+    # Deleting a subscription that doesn't exist is a no-op, so there is no
+    # need to look the connection's subscriptions up first.
+    remove_subscriptions(
+        OrderSubscription(
+            tenant_id=data.tenant_id,
+            order_id=order_id,
+            connection_id=connection_id,
+            connected_at=connected_at,
+        )
+        for order_id in data.targets()
+    )
+
+    res = WebSocketMessage(
+        kind=WebSocketMessageKind.unsubscription_success,
+        data={"message": "Unsubscribed.", "order_ids": data.targets()},
+    )
+    return response(200, res)
@@ -1,8 +1,16 @@
+import os
+import random
 from decimal import Decimal
 from enum import Enum
-from typing import Any, Optional
+from typing import Any, Optional, Self
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
+
+from schemas.storage import decode_order, encode_order
+
+# Fraction of trusted reads that still run full validation, so that bad data
+# written by our own code surfaces instead of passing through silently.
+VALIDATION_SAMPLE_RATE = float(os.environ.get("ORDER_VALIDATION_SAMPLE_RATE") or 0.01)
 
 
 class UserRole(str, Enum):
@@ -58,6 +66,18 @@ class OrderHistoryEntry(BaseModel):
     date: str
 
 
+class OrderHistoryRecord(OrderHistoryEntry):
+    model_config = {"serialize_by_alias": True}
+
+    tenant_id: str
+    order_id: str
+
+    @computed_field(alias="tenant_id#order_id")
+    @property
+    def tenant_id_order_id(self) -> str:
+        return f"{self.tenant_id}#{self.order_id}"
+
+
 class Order(BaseModel):
     model_config = {"serialize_by_alias": True}
 
@@ -83,27 +103,105 @@ class Order(BaseModel):
     )
     driver: Optional[User] = None
 
+    # Full history lives in the order history table. Orders written before it
+    # existed still carry their history inline, and reads can opt into an
+    # inline summary of the latest entries.
     history: list[OrderHistoryEntry] = []
+    last_transition: Optional[OrderHistoryEntry] = None
+    version: int = 0
+
+    def to_item(self) -> dict:
+        return encode_order(self.model_dump(exclude_none=True))
+
+    @classmethod
+    def from_item(cls, item: dict) -> Self:
+        return cls(**decode_order(item))
+
+    # For data this service wrote itself (DynamoDB items, EventBridge details)
+    # on paths that only read a few attributes. pydantic-core validation is
+    # already as fast as building the models by hand, so the saving comes from
+    # not materializing the item, product and history tree at all.
+    @classmethod
+    def decode_trusted(cls, item: dict) -> dict:
+        data = decode_order(item)
+
+        if random.random() < VALIDATION_SAMPLE_RATE:
+            cls(**data)
+
+        return data
 
 
 class FullOrder(Order):
     execution_history: Optional[Any] = None
 
 
+TENANT_WIDE_SUBSCRIPTION = "*"
+
+
+def subscription_key(tenant_id: str, order_id: Optional[str]) -> str:
+    return f"{tenant_id}#{order_id or TENANT_WIDE_SUBSCRIPTION}"
+
+
 class OrderSubscription(BaseModel):
+    model_config = {"serialize_by_alias": True}
+
     tenant_id: str
     order_id: Optional[str] = None
     connection_id: str
     connected_at: int
+    snapshot: bool = False
+    expires_at: Optional[int] = None
+
+    @computed_field(alias="tenant_id#order_id")
+    @property
+    def tenant_id_order_id(self) -> str:
+        return subscription_key(self.tenant_id, self.order_id)
+
+    def key(self) -> dict:
+        return {
+            "tenant_id#order_id": self.tenant_id_order_id,
+            "connection_id": self.connection_id,
+        }
+
+
+# The orders a subscribe or unsubscribe request is about. order_id and
+# order_ids can be combined; a request naming no order is about the whole
+# tenant, and tenant_wide adds the tenant to a list of orders.
+class SubscriptionTargets(BaseModel):
+    tenant_id: str
+    order_id: Optional[str] = None
+    order_ids: list[str] = []
+    tenant_wide: bool = False
+
+    def targets(self) -> list[Optional[str]]:
+        order_ids: list[Optional[str]] = list(dict.fromkeys(self.order_ids))
+
+        if self.order_id != None and not self.order_id in order_ids:
+            order_ids.append(self.order_id)
+
+        if self.tenant_wide or len(order_ids) == 0:
+            order_ids.append(None)
+
+        return order_ids
 
 
 class WebSocketMessageKind(str, Enum):
     subscription_success = "subscription_success"
     subscription_failed = "subscription_failed"
+    unsubscription_success = "unsubscription_success"
     order_created = "order_created"
     order_status_updated = "order_status_updated"
 
 
+class OrderStatusUpdate(BaseModel):
+    tenant_id: str
+    order_id: str
+    status: OrderStatus
+    actor: Optional[AuthorizedUser] = None
+    date: Optional[str] = None
+    version: int
+
+
 class WebSocketMessage(BaseModel):
     kind: WebSocketMessageKind
     data: dict
@@ -0,0 +1,117 @@
+# Compact DynamoDB/EventBridge representation of orders.
+#
+# Top-level attribute names are left alone because table keys, indexes and
+# projections refer to them. Nested snapshots are shortened instead: the
+# tenant id, which always equals the order's, is dropped from every embedded
+# product and user, the remaining keys are abbreviated, and a history entry
+# whose user is also assigned on the order stores the attribute name instead
+# of a second copy. Decoding accepts both layouts so items written before the
+# compact encoding keep working.
+
+USER_ATTRIBUTES = ["client", "cook", "dispatcher", "driver"]
+
+USER_KEYS = {"user_id": "id", "email": "e", "username": "n", "role": "r"}
+ITEM_KEYS = {"product_id": "id", "name": "n", "price": "p", "image_url": "img"}
+
+
+def encode_user(user: dict) -> dict:
+    return {short: user[key] for key, short in USER_KEYS.items() if key in user}
+
+
+def decode_user(user: dict, tenant_id: str) -> dict:
+    if "user_id" in user:
+        return user
+
+    return {
+        "tenant_id": tenant_id,
+        **{key: user[short] for key, short in USER_KEYS.items() if short in user},
+    }
+
+
+def encode_order_item(item: dict) -> dict:
+    product = item["product"]
+
+    return {
+        **{
+            short: product[key]
+            for key, short in ITEM_KEYS.items()
+            if product.get(key) != None
+        },
+        "q": item["quantity"],
+    }
+
+
+def decode_order_item(item: dict, tenant_id: str) -> dict:
+    if "product" in item:
+        return item
+
+    return {
+        "product": {
+            "tenant_id": tenant_id,
+            **{key: item[short] for key, short in ITEM_KEYS.items() if short in item},
+        },
+        "quantity": item["q"],
+    }
+
+
+def encode_history_entry(entry: dict, order: dict | None = None) -> dict:
+    user = entry["user"]
+
+    for attribute in USER_ATTRIBUTES:
+        assigned = (order or {}).get(attribute)
+        if assigned != None and assigned.get("user_id") == user["user_id"]:
+            return {**entry, "user": attribute}
+
+    return {**entry, "user": encode_user(user)}
+
+
+def decode_history_entry(entry: dict, order: dict, tenant_id: str) -> dict:
+    user = entry["user"]
+
+    if isinstance(user, str):
+        user = order[user]
+
+    return {**entry, "user": decode_user(user, tenant_id)}
+
+
+def encode_order(order: dict) -> dict:
+    item = dict(order)
+
+    if "items" in item:
+        item["items"] = [encode_order_item(i) for i in item["items"]]
+
+    if "last_transition" in item:
+        item["last_transition"] = encode_history_entry(item["last_transition"], order)
+
+    if "history" in item:
+        item["history"] = [encode_history_entry(e, order) for e in item["history"]]
+
+    for attribute in USER_ATTRIBUTES:
+        if item.get(attribute) != None:
+            item[attribute] = encode_user(item[attribute])
+
+    return item
+
+
+def decode_order(item: dict) -> dict:
+    tenant_id = item["tenant_id"]
+    order = dict(item)
+
+    for attribute in USER_ATTRIBUTES:
+        if order.get(attribute) != None:
+            order[attribute] = decode_user(order[attribute], tenant_id)
+
+    if "items" in order:
+        order["items"] = [decode_order_item(i, tenant_id) for i in order["items"]]
+
+    if order.get("last_transition") != None:
+        order["last_transition"] = decode_history_entry(
+            order["last_transition"], order, tenant_id
+        )
+
+    if "history" in order:
+        order["history"] = [
+            decode_history_entry(e, order, tenant_id) for e in order["history"]
+        ]
+
+    return order
@@ -0,0 +1,80 @@
+# Rewrites existing orders in the compact storage encoding.
+#
+#   python -m scripts.migrate_compact_orders [--dry-run]
+#
+# Only the re-encoded attributes are written, and only if the order's status
+# and version are unchanged since it was scanned, so it is safe to run against
+# a live table: attributes written without a version bump (task_token,
+# execution_arn) are left alone.
+
+import sys
+
+from boto3.dynamodb.conditions import Attr
+
+from common.clients import table
+from schemas.storage import USER_ATTRIBUTES, decode_order, encode_order
+
+ENCODED_ATTRIBUTES = ["items", *USER_ATTRIBUTES, "history", "last_transition"]
+
+
+def migrate(dry_run: bool = False):
+    orders = table("orders")
+    scanned = 0
+    migrated = 0
+    skipped = 0
+
+    params: dict = {}
+
+    while True:
+        resp = orders.scan(**params)
+
+        for item in resp.get("Items", []):
+            scanned += 1
+
+            compact = encode_order(decode_order(item))
+            changed = [
+                attribute
+                for attribute in ENCODED_ATTRIBUTES
+                if compact.get(attribute) != item.get(attribute)
+            ]
+            if len(changed) == 0:
+                continue
+
+            if dry_run:
+                migrated += 1
+                continue
+
+            if "version" in item:
+                unchanged = Attr("version").eq(item["version"])
+            else:
+                unchanged = Attr("version").not_exists()
+
+            try:
+                orders.update_item(
+                    Key={"tenant_id": item["tenant_id"], "order_id": item["order_id"]},
+                    UpdateExpression="SET "
+                    + ", ".join(f"#a{i} = :a{i}" for i in range(len(changed))),
+                    ConditionExpression=unchanged & Attr("status").eq(item["status"]),
+                    ExpressionAttributeNames={
+                        f"#a{i}": attribute for i, attribute in enumerate(changed)
+                    },
+                    ExpressionAttributeValues={
+                        f":a{i}": compact[attribute]
+                        for i, attribute in enumerate(changed)
+                    },
+                )
+                migrated += 1
+            except orders.meta.client.exceptions.ConditionalCheckFailedException:
+                skipped += 1
+
+        last_key = resp.get("LastEvaluatedKey")
+        if last_key == None:
+            break
+
+        params["ExclusiveStartKey"] = last_key
+
+    print(f"scanned={scanned} migrated={migrated} skipped={skipped}")
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)